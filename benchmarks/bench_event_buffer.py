@@ -0,0 +1,84 @@
+# 录制事件缓冲内存基准：对比字典列表与列式数组缓冲在一百万个事件的录制会话中的内存占用和追加/导出耗时
+# 用法（在项目根目录）：python -m benchmarks.bench_event_buffer [事件数]
+import random
+import sys
+import time
+import tracemalloc
+from core.event_buffer import EventBuffer
+
+EVENTS = 1_000_000
+KEYS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def make_events(count, seed=0):
+    """按真实录制的比例生成事件：大部分是拖动中的 move，其余为按下/松开、点击、滚轮和键盘"""
+    rng = random.Random(seed)
+    x, y, t = 960, 540, 1_700_000_000.0
+    for _ in range(count):
+        t += rng.uniform(0.001, 0.02)
+        roll = rng.random()
+        if roll < 0.9:
+            x, y = max(0, x + rng.randint(-5, 5)), max(0, y + rng.randint(-5, 5))
+            yield {"action": "move", "position": [x, y], "time": t}
+        elif roll < 0.94:
+            action = "mouseDown" if roll < 0.92 else "mouseUp"
+            yield {"action": action, "position": [x, y], "button": "left", "time": t}
+        elif roll < 0.96:
+            yield {"action": "click",
+                   "locator": {"by": "image", "value": f"recorded_images/{rng.getrandbits(128):032x}.png",
+                               "fallback": [x, y]},
+                   "button": "left", "time": t}
+        elif roll < 0.98:
+            yield {"action": "scroll", "position": [x, y], "delta": rng.choice((-1, 1)), "time": t}
+        else:
+            yield {"action": "keyboard", "key": rng.choice(KEYS), "time": t}
+
+
+def measure(build, count):
+    """返回 (缓冲对象, 常驻字节数, 峰值字节数, 耗时秒)；生成事件的开销对两种缓冲相同，一并计入"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    buffer = build(make_events(count))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return buffer, current, peak, elapsed
+
+
+def build_list(events):
+    script = []
+    for step in events:
+        script.append(step)
+    return script
+
+
+def build_columns(events):
+    buffer = EventBuffer()
+    for step in events:
+        buffer.append(step)
+    return buffer
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    mb = 1024 * 1024
+    print(f"{'缓冲':<10}{'常驻(MB)':>10}{'峰值(MB)':>10}{'每事件(B)':>11}{'录制(s)':>9}")
+    script, list_bytes, list_peak, list_time = measure(build_list, count)
+    print(f"{'字典列表':<10}{list_bytes / mb:>10.1f}{list_peak / mb:>10.1f}"
+          f"{list_bytes / count:>11.0f}{list_time:>9.2f}")
+    del script
+    buffer, col_bytes, col_peak, col_time = measure(build_columns, count)
+    print(f"{'列式缓冲':<10}{col_bytes / mb:>10.1f}{col_peak / mb:>10.1f}"
+          f"{col_bytes / count:>11.0f}{col_time:>9.2f}")
+    print(f"常驻内存减少 {list_bytes / col_bytes:.1f} 倍（其中数组列 {buffer.nbytes() / mb:.1f}MB）")
+
+    start = time.perf_counter()
+    exported = buffer.to_script()
+    print(f"停止录制时导出为脚本：{(time.perf_counter() - start):.2f}s")
+    expected = list(make_events(count))
+    assert exported == expected, "导出结果与原始事件不一致"
+    print("导出结果与原始事件一致")
+
+
+if __name__ == "__main__":
+    main()
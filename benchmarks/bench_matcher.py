@@ -0,0 +1,57 @@
+# 模板匹配基准：对比全分辨率匹配与金字塔匹配在 1080p / 4K 帧上的耗时
+# 用法（在项目根目录）：python -m benchmarks.bench_matcher
+import time
+import cv2
+import numpy as np
+from core.matcher import FramePyramid, TemplateMatcher
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+TEMPLATE_SIZE = 120  # 与默认 image_region_size 一致
+CONFIDENCE = 0.85
+ROUNDS = 10
+
+
+def make_frame(width, height, seed=0):
+    """生成带纹理和"控件"色块的合成屏幕，避免纯噪声导致匹配过于容易"""
+    rng = np.random.default_rng(seed)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width), dtype=np.uint8), (9, 9), 0)
+    for _ in range(200):
+        x, y = int(rng.integers(0, width - 80)), int(rng.integers(0, height - 40))
+        color = int(rng.integers(0, 256))
+        cv2.rectangle(frame, (x, y), (x + int(rng.integers(20, 80)), y + int(rng.integers(10, 40))), color, -1)
+        cv2.putText(frame, "OK", (x + 4, y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 255 - color, 1)
+    return frame
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000, result
+
+
+def full_resolution(frame, template):
+    scores = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (x, y) = cv2.minMaxLoc(scores)
+    th, tw = template.shape[:2]
+    return (x + tw // 2, y + th // 2, score) if score >= CONFIDENCE else None
+
+
+def main():
+    matcher = TemplateMatcher(CONFIDENCE)
+    print(f"{'分辨率':<8}{'全分辨率(ms)':>14}{'金字塔(ms)':>14}{'加速比':>8}  结果")
+    for name, (width, height) in RESOLUTIONS.items():
+        frame = make_frame(width, height)
+        x, y = width * 2 // 3, height // 3
+        template = frame[y:y + TEMPLATE_SIZE, x:x + TEMPLATE_SIZE].copy()
+        expected = (x + TEMPLATE_SIZE // 2, y + TEMPLATE_SIZE // 2)
+
+        base_ms, base_hit = timed(lambda: full_resolution(frame, template))
+        # 金字塔的构建计入耗时：回放时每帧都要重新构建
+        pyr_ms, pyr_hit = timed(lambda: matcher.match(FramePyramid(frame), template))
+        ok = base_hit and pyr_hit and base_hit[:2] == expected and pyr_hit[:2] == expected
+        print(f"{name:<8}{base_ms:>14.1f}{pyr_ms:>14.1f}{base_ms / pyr_ms:>8.1f}x  {'一致' if ok else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# cli.py
+# 无界面命令行回放入口：不导入 PyQt5，供 CI 等环境批量执行脚本
+# 用法：python cli.py 3 5 --tag smoke --file case.json --mode turbo
+import argparse
+import json
+import sys
+import time
+
+EXIT_OK = 0  # 全部步骤成功
+EXIT_FAILED = 1  # 有步骤失败
+EXIT_USAGE = 2  # 参数或脚本加载错误
+EXIT_INTERRUPTED = 130
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="GUI 自动化测试工具 - 命令行回放")
+    parser.add_argument("ids", nargs="*", type=int, help="scripts 表中的脚本 id")
+    parser.add_argument("--tag", action="append", default=[], help="按标签选择脚本，可重复")
+    parser.add_argument("--file", action="append", default=[], help="JSON 脚本文件，可重复")
+    parser.add_argument("--mode", choices=["realtime", "scaled", "turbo", "ready"], help="回放模式，默认取配置")
+    parser.add_argument("--speed", type=float, help="scaled 模式的倍速")
+    parser.add_argument("--pipeline", action="store_true", help="流水线回放：等待间隔时提前匹配下一步")
+    parser.add_argument("--parallel", type=int, default=0, help="在 N 个 Xvfb 虚拟显示上并行执行（仅数据库脚本）")
+    parser.add_argument("--no-report", action="store_true", help="不写入测试报告")
+    return parser.parse_args(argv)
+
+
+def load_scripts(args):
+    """按 id / 标签 / 文件收集脚本，返回 [(名称, script_id, 内容)]"""
+    scripts = []
+    if args.ids or args.tag:
+        from core.script_manager import ScriptManager
+        manager = ScriptManager()
+        ids = list(args.ids)
+        ids += [s["id"] for s in manager.list_by_tags(args.tag) if s["id"] not in ids]
+        for sid in ids:
+            data = manager.load_by_id(sid)
+            if "title" not in data:
+                raise ValueError(f"脚本不存在：{sid}")
+            scripts.append((f"#{sid} {data['title']}", sid, data["content"]))
+    for path in args.file:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        scripts.append((path, None, data if isinstance(data, list) else data.get("content", [])))
+    return scripts
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        scripts = load_scripts(args)
+    except (OSError, ValueError) as e:
+        print(f"加载脚本失败：{e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not scripts:
+        print("没有指定要执行的脚本（脚本 id、--tag 或 --file）", file=sys.stderr)
+        return EXIT_USAGE
+
+    from core.config_manager import ConfigManager
+    config = ConfigManager().load_all()
+    if args.mode:
+        config["replay_mode"] = args.mode
+    if args.speed:
+        config["replay_speed"] = args.speed
+    if args.pipeline:
+        config["pipeline"] = True
+
+    if args.parallel:
+        if any(sid is None for _, sid, _ in scripts):
+            print("--parallel 只支持数据库中的脚本", file=sys.stderr)
+            return EXIT_USAGE
+        from core.suite_runner import SuiteRunner
+        summary = SuiteRunner(config, args.parallel).run([(sid, content) for _, sid, content in scripts])
+        return EXIT_OK if summary["failed"] == 0 and summary["errors"] == 0 else EXIT_FAILED
+
+    from core.test_executor import TestExecutor
+    executor = TestExecutor(config)
+    failed = 0
+    start = time.time()
+    try:
+        for n, (name, sid, content) in enumerate(scripts, 1):
+            print(f"[{n}/{len(scripts)}] 执行 {name}（{len(content)} 步）", flush=True)
+            report = executor.run_script(content, sid, save_report=not args.no_report)
+            ok = report["total"] > 0 and report["success"] == report["total"]
+            failed += 0 if ok else 1
+            print(f"[{n}/{len(scripts)}] {'通过' if ok else '失败'} {name}：{report['summary']}，"
+                  f"用时 {report['duration']}s", flush=True)
+    except KeyboardInterrupt:
+        print("已中断", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    print(f"完成：{len(scripts) - failed} 通过，{failed} 失败，总用时 {time.time() - start:.2f}s")
+    return EXIT_OK if failed == 0 else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+import cv2
+from core.capture import save_image
+from core.frame_diff import frame_signature
+from utils.logger import log
+
+
+class ArtifactWriter:
+    """失败截图的后台写入器：回放线程只把帧放入队列，编码和写盘在后台线程完成。
+    排队中的帧按字节数限额，超出时丢弃并记录；画面相同的截图按内容摘要去重，只写一次"""
+
+    def __init__(self, root="data/errors", max_bytes=64 * 1024 * 1024, compression=1, max_hashes=256):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.params = [cv2.IMWRITE_PNG_COMPRESSION, compression]  # 低压缩级别：编码快得多，文件略大
+        self.max_hashes = max_hashes
+        self._queue = deque()  # (run_id, 步骤序号, 帧, 原因)
+        self._pending_bytes = 0
+        self._writing = None  # 正在写入的任务所属的 run_id
+        self._seen = OrderedDict()  # 内容摘要 -> 已写入的路径
+        self._results = {}  # run_id -> [截图记录]
+        self._cond = threading.Condition()
+        self._thread = None
+        self.written = 0
+        self.duplicates = 0
+        self.dropped = 0
+
+    @staticmethod
+    def new_run_id():
+        """每次回放一个目录名：时间戳 + 进程号，并行回放的多个进程互不覆盖"""
+        now = time.time()
+        return f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{int(now * 1000) % 1000:03d}_{os.getpid()}"
+
+    def submit(self, run_id, step_index, frame, reason=""):
+        """提交一帧失败截图，立即返回；队列已满时丢弃并返回 False"""
+        with self._cond:
+            if self._pending_bytes + frame.nbytes > self.max_bytes:
+                self.dropped += 1
+                self._results.setdefault(run_id, []).append(
+                    {"step_index": step_index, "path": None, "hash": None, "reason": reason, "status": "dropped"})
+                return False
+            self._queue.append((run_id, step_index, frame, reason))
+            self._pending_bytes += frame.nbytes
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="artifact-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def finish_run(self, run_id, timeout=10):
+        """等待该次回放提交的截图全部写完（最多 timeout 秒），返回按步骤排序的截图记录"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._writing == run_id or any(job[0] == run_id for job in self._queue):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    log(f"[失败截图] 等待写入超时，仍有截图在后台写入：{run_id}")
+                    break
+                self._cond.wait(remaining)
+            records = self._results.pop(run_id, [])
+        return sorted(records, key=lambda r: r["step_index"])
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                run_id, step_index, frame, reason = self._queue.popleft()
+                self._writing = run_id
+            try:
+                record = self._write(run_id, step_index, frame, reason)
+            except Exception as e:
+                log(f"[失败截图] 步骤 {step_index + 1} 截图保存失败：{e}")
+                record = {"step_index": step_index, "path": None, "hash": None, "reason": reason, "status": "error"}
+            with self._cond:
+                self._pending_bytes -= frame.nbytes
+                self._writing = None
+                self._results.setdefault(run_id, []).append(record)
+                self._cond.notify_all()
+
+    def _write(self, run_id, step_index, frame, reason):
+        digest = frame_signature(frame).hex()
+        path = self._seen.get(digest)
+        if path and os.path.exists(path):
+            # 与之前的失败画面完全相同（例如同一个弹窗挡住了后续所有步骤），直接引用已有文件
+            self._seen.move_to_end(digest)
+            self.duplicates += 1
+            return {"step_index": step_index, "path": path, "hash": digest, "reason": reason, "status": "duplicate"}
+
+        directory = os.path.join(self.root, run_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"step_{step_index + 1:04d}.png")
+        save_image(frame, path, self.params)
+        self._seen[digest] = path
+        while len(self._seen) > self.max_hashes:
+            self._seen.popitem(last=False)
+        self.written += 1
+        return {"step_index": step_index, "path": path, "hash": digest, "reason": reason, "status": "written"}
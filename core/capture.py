@@ -0,0 +1,231 @@
+import glob
+import os
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from utils.logger import log
+
+
+class CaptureBackend:
+    """屏幕截图后端接口：grab 返回 OpenCV 顺序（BGR 或 BGRA）的 numpy 数组"""
+    name = "base"
+
+    def grab(self, region=None):
+        """截取整屏或 region (left, top, width, height) 区域"""
+        raise NotImplementedError
+
+    def screen_size(self):
+        """整屏尺寸 (width, height)；默认实现截一次整屏取尺寸，后端可以覆盖为更便宜的查询"""
+        h, w = self.grab().shape[:2]
+        return w, h
+
+    def close(self):
+        pass
+
+
+class MssBackend(CaptureBackend):
+    """基于 mss 的低延迟截图（X11 下走 XShm 共享内存），直接返回截图缓冲区上的 BGRA 视图，不做额外拷贝"""
+    name = "mss"
+
+    def __init__(self):
+        import mss
+        self._mss = mss
+        self._local = threading.local()  # mss 实例不能跨线程使用，每个线程各建一个
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = self._mss.mss()
+        return sct
+
+    def grab(self, region=None):
+        sct = self._sct()
+        if region:
+            left, top, width, height = region
+            monitor = {"left": left, "top": top, "width": width, "height": height}
+        else:
+            # 与 pyautogui 的坐标系保持一致，只截主显示器（1 号；0 号是所有显示器拼成的虚拟屏幕）
+            monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
+        shot = sct.grab(monitor)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def screen_size(self):
+        sct = self._sct()
+        monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
+        return monitor["width"], monitor["height"]
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct:
+            sct.close()
+            self._local.sct = None
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """原有的 pyautogui 截图路径（PIL 图像，转换为 BGR 数组）"""
+    name = "pyautogui"
+
+    def grab(self, region=None):
+        import pyautogui
+        image = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+    def screen_size(self):
+        import pyautogui
+        width, height = pyautogui.size()
+        return width, height
+
+
+class FileBackend(CaptureBackend):
+    """从图像文件提供"屏幕帧"，用于无显示器环境下的基准测试和调试；每次 grab 前进一帧，到末尾后循环或停在最后一帧"""
+    name = "file"
+
+    def __init__(self, paths, loop=True):
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(os.path.join(paths, "*.png"))) if os.path.isdir(paths) else sorted(glob.glob(paths))
+        if not paths:
+            raise ValueError("FileBackend 没有可用的帧文件")
+        self.frames = [load_image(p) for p in paths]
+        self.loop = loop
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def grab(self, region=None):
+        with self._lock:
+            frame = self.frames[self._index]
+            if self._index + 1 < len(self.frames):
+                self._index += 1
+            elif self.loop:
+                self._index = 0
+        if region:
+            left, top, width, height = region
+            frame = frame[top:top + height, left:left + width]
+        return frame
+
+    def screen_size(self):
+        h, w = self.frames[self._index].shape[:2]
+        return w, h
+
+
+class FrameRing:
+    """录制时在后台按固定频率截整屏的环形缓冲：按字节数限额，超出时丢弃最旧的帧。
+    点击模板从鼠标按下之前的最后一帧上裁剪，拿到的是按下/悬停之前、回放时会看到的画面"""
+
+    def __init__(self, backend, fps=10, max_bytes=64 * 1024 * 1024):
+        self.backend = backend
+        self.interval = 1.0 / fps
+        self.max_bytes = max_bytes
+        self._frames = deque()  # (截取完成时间, 帧)，按时间递增
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.grabs = 0
+        self.evictions = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="frame-ring", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(1)
+            self._thread = None
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                frame = self.backend.grab()
+            except Exception as e:
+                log(f"[帧缓冲] 截屏失败，停止后台截屏：{e}")
+                return
+            # 以截取完成的时间为准：4K 整屏截图要几十毫秒，开始于按下之前的帧可能完成于按下之后，拍到的是按下态
+            taken = time.time()
+            with self._lock:
+                self._frames.append((taken, frame))
+                self._bytes += frame.nbytes
+                self.grabs += 1
+                while self._bytes > self.max_bytes and len(self._frames) > 1:
+                    _, old = self._frames.popleft()
+                    self._bytes -= old.nbytes
+                    self.evictions += 1
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def before(self, timestamp, max_age=1.0):
+        """返回 timestamp 之前截取完成的最后一帧；缓冲中没有或已超过 max_age 秒时返回 None"""
+        with self._lock:
+            for taken, frame in reversed(self._frames):
+                if taken < timestamp:
+                    return frame if timestamp - taken <= max_age else None
+        return None
+
+
+def clip_region(region, size):
+    """把 region (left, top, width, height) 裁到屏幕 size (width, height) 以内，只截掉超出的部分、不平移；
+    完全在屏幕外时返回 None"""
+    left, top, width, height = region
+    right, bottom = min(size[0], left + width), min(size[1], top + height)
+    left, top = max(0, left), max(0, top)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right - left, bottom - top
+
+
+def crop(frame, region):
+    """从整屏帧上裁剪 region (left, top, width, height)，超出屏幕的部分被截掉（不平移窗口）"""
+    h, w = frame.shape[:2]
+    clipped = clip_region(region, (w, h))
+    if clipped is None:
+        return frame[0:0, 0:0]
+    left, top, width, height = clipped
+    return frame[top:top + height, left:left + width]
+
+
+def create_backend(config=None):
+    """按配置 capture_backend 创建截图后端：auto（优先 mss）/ mss / pyautogui / file"""
+    config = config or {}
+    name = config.get("capture_backend", "auto")
+    if name == "file":
+        return FileBackend(config.get("capture_files", "data/frames"), config.get("capture_loop", True))
+    if name == "pyautogui":
+        return PyAutoGuiBackend()
+    try:
+        return MssBackend()
+    except ImportError:
+        if name == "mss":
+            raise
+        log("[截图] 未安装 mss，使用 pyautogui 截图")
+        return PyAutoGuiBackend()
+
+
+def to_gray(frame):
+    """BGR/BGRA 帧转灰度"""
+    if frame.ndim == 2:
+        return frame
+    code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(frame, code)
+
+
+def load_image(path):
+    """读取图像为 BGR 数组，兼容中文路径"""
+    image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise IOError(f"图像解码失败：{path}")
+    return image
+
+
+def save_image(frame, path, params=None):
+    """把 BGR/BGRA 帧保存为图像文件，兼容中文路径；params 为 cv2.imencode 的编码参数"""
+    ext = os.path.splitext(path)[1] or ".png"
+    ok, data = cv2.imencode(ext, frame, params or [])
+    if not ok:
+        raise IOError(f"图像编码失败：{path}")
+    data.tofile(path)
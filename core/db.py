@@ -79,8 +79,42 @@ class Database:
           success_rate REAL,
           duration REAL,
           detail TEXT,
+          replay_mode TEXT,
           created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )""")
+        self._ensure_column("reports", "replay_mode", "TEXT")
+        # 分步计时表：每个报告每一步一行，各阶段耗时单位为秒，attempts 为每次定位尝试耗时的 JSON 数组
+        c.execute("""CREATE TABLE IF NOT EXISTS step_timings (
+          report_id INTEGER NOT NULL,
+          step_index INTEGER NOT NULL,
+          action TEXT,
+          capture REAL,
+          locate REAL,
+          inject REAL,
+          sleep REAL,
+          total REAL,
+          attempts TEXT,
+          success INTEGER,
+          PRIMARY KEY (report_id, step_index)
+        )""")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_step_timings_action ON step_timings(action)")
+        # 失败截图表：每个失败步骤一行，画面相同的多个步骤可能指向同一个文件
+        c.execute("""CREATE TABLE IF NOT EXISTS report_artifacts (
+          report_id INTEGER NOT NULL,
+          step_index INTEGER NOT NULL,
+          path TEXT,
+          hash TEXT,
+          reason TEXT,
+          status TEXT,
+          PRIMARY KEY (report_id, step_index)
+        )""")
+        self.conn.commit()
+
+    def _ensure_column(self, table, column, decl):
+        """旧数据库升级：缺少的列用 ALTER TABLE 补上"""
+        columns = [r["name"] for r in self.conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
 
 
     def execute(self, sql, params=()):
@@ -89,6 +123,12 @@ class Database:
         self.conn.commit()
         return c
 
+    def executemany(self, sql, rows):
+        c = self.conn.cursor()
+        c.executemany(sql, rows)
+        self.conn.commit()
+        return c
+
     def query(self, sql, params=()):
         try:
             c = self.conn.cursor()
@@ -0,0 +1,136 @@
+from array import array
+
+# 每种录制动作除 action/time 外的字段；按这里的顺序导出，与录制器原来生成的字典键顺序一致
+SCHEMA = {
+    "mouseDown": ("position", "button"),
+    "mouseUp": ("position", "button"),
+    "click": ("locator", "button"),
+    "scroll": ("position", "delta"),
+    "move": ("position",),
+    "keyboard": ("key",),
+}
+OTHER = 0xFFFF  # 不符合 SCHEMA 的事件：整个字典原样放在 extras 中
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def _is_int(value):
+    return type(value) is int and INT_MIN <= value <= INT_MAX
+
+
+class EventBuffer:
+    """录制事件的列式缓冲：动作、x、y、按键、时间等各存一列定长数组，字符串（动作名、鼠标键、键盘键）
+    驻留为编号，一个 move 事件只占二十多字节，而字典形式要几百字节。
+    点击的图像定位数量少且之后还要回填，单独放在 extras 中；导出时才还原为脚本的字典格式"""
+
+    def __init__(self):
+        self.strings = []  # 编号 -> 字符串
+        self._string_ids = {}  # 字符串 -> 编号
+        self.action = array("H")
+        self.x = array("i")
+        self.y = array("i")
+        self.button = array("H")  # 鼠标键名的字符串编号
+        self.arg = array("i")  # scroll 的 delta，或 keyboard 键名的字符串编号
+        self.time = array("d")
+        self.extras = {}  # 序号 -> click 的 locator，或不符合 SCHEMA 的整个事件
+
+    def __len__(self):
+        return len(self.action)
+
+    def intern(self, text):
+        index = self._string_ids.get(text)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(text)
+            self._string_ids[text] = index
+        return index
+
+    def append(self, step):
+        """追加一个录制步骤（字典），返回其序号"""
+        index = len(self.action)
+        fields = SCHEMA.get(step.get("action"))
+        if fields is None or not self._encodable(step, fields):
+            self._push(OTHER, 0, 0, 0, 0, 0.0)
+            self.extras[index] = step
+            return index
+        x = y = button = arg = 0
+        if "position" in fields:
+            x, y = step["position"]
+        if "button" in fields:
+            button = self.intern(step["button"])
+        if "delta" in fields:
+            arg = step["delta"]
+        if "key" in fields:
+            arg = self.intern(step["key"])
+        if "locator" in fields:
+            self.extras[index] = step["locator"]
+        self._push(self.intern(step["action"]), x, y, button, arg, step["time"])
+        return index
+
+    def patch(self, index, fields):
+        """回填已追加步骤的字段；目前只有点击截图完成后的 locator"""
+        if self.action[index] == OTHER:
+            self.extras[index].update(fields)
+        elif set(fields) == {"locator"} and index in self.extras:
+            self.extras[index] = fields["locator"]
+        else:
+            step = self.step(index)
+            step.update(fields)
+            self.extras[index] = step
+            self.action[index] = OTHER
+
+    def step(self, index):
+        """还原第 index 个事件为脚本字典"""
+        code = self.action[index]
+        if code == OTHER:
+            return dict(self.extras[index])
+        action = self.strings[code]
+        step = {"action": action}
+        for field in SCHEMA[action]:
+            if field == "position":
+                step["position"] = [self.x[index], self.y[index]]
+            elif field == "button":
+                step["button"] = self.strings[self.button[index]]
+            elif field == "delta":
+                step["delta"] = self.arg[index]
+            elif field == "key":
+                step["key"] = self.strings[self.arg[index]]
+            elif field == "locator":
+                step["locator"] = dict(self.extras[index])
+        step["time"] = self.time[index]
+        return step
+
+    def to_script(self):
+        """导出为 JSON 脚本格式（字典列表）"""
+        return [self.step(i) for i in range(len(self.action))]
+
+    def nbytes(self):
+        """各列数组占用的字节数（不含字符串表和 extras）"""
+        columns = (self.action, self.x, self.y, self.button, self.arg, self.time)
+        return sum(len(c) * c.itemsize for c in columns)
+
+    def _encodable(self, step, fields):
+        """只有字段完全符合 SCHEMA 且类型可以无损存入数组的事件才按列存储，保证导出结果与原字典一致"""
+        if len(step) != len(fields) + 2 or type(step.get("time")) is not float:
+            return False
+        for field in fields:
+            value = step.get(field)
+            if field == "position":
+                if type(value) is not list or len(value) != 2 or not all(_is_int(v) for v in value):
+                    return False
+            elif field == "delta":
+                if not _is_int(value):
+                    return False
+            elif field == "locator":
+                if type(value) is not dict:
+                    return False
+            elif type(value) is not str:
+                return False
+        return True
+
+    def _push(self, action, x, y, button, arg, t):
+        self.action.append(action)
+        self.x.append(x)
+        self.y.append(y)
+        self.button.append(button)
+        self.arg.append(arg)
+        self.time.append(t)
@@ -0,0 +1,45 @@
+import hashlib
+import cv2
+import numpy as np
+
+
+def frame_signature(gray):
+    """灰度帧（通常取金字塔的缩小层）的内容摘要，用于快速判断画面是否变化"""
+    return hashlib.blake2b(gray.tobytes(), digest_size=16).digest()
+
+
+def changed_tiles(prev, cur, tile, threshold=0):
+    """按 tile×tile 网格比较两帧灰度图，返回 (行数, 列数) 的布尔矩阵，True 表示该图块有变化"""
+    diff = cv2.absdiff(prev, cur)
+    h, w = diff.shape[:2]
+    rows, cols = -(-h // tile), -(-w // tile)
+    padded = np.zeros((rows * tile, cols * tile), dtype=diff.dtype)
+    padded[:h, :w] = diff
+    return padded.reshape(rows, tile, cols, tile).max(axis=(1, 3)) > threshold
+
+
+def dirty_regions(mask, tile, frame_shape):
+    """把相连的变化图块合并成矩形，返回像素坐标 (left, top, width, height) 列表"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    h, w = frame_shape[:2]
+    regions = []
+    for i in range(1, count):  # 0 号连通域是未变化的背景
+        col, row, cols, rows = stats[i][:4]
+        left, top = col * tile, row * tile
+        regions.append((left, top, min(w, (col + cols) * tile) - left, min(h, (row + rows) * tile) - top))
+    return regions
+
+
+def thumbnail(gray, levels=2):
+    """把灰度帧缩小 2^levels 倍，用于低成本的画面变化检测"""
+    for _ in range(levels):
+        gray = cv2.pyrDown(gray)
+    return gray
+
+
+def change_ratio(prev, cur, block=8, tolerance=8):
+    """两张缩略图之间发生变化的块所占比例；块内最大像素差超过 tolerance 才算变化，以过滤噪声"""
+    if prev.shape != cur.shape:
+        return 1.0
+    mask = changed_tiles(prev, cur, block, tolerance)
+    return float(mask.mean())
@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import os
+import re
+import threading
+import cv2
+from core.capture import load_image, save_image
+from utils.logger import log
+
+HASH_NAME = re.compile(r"^[0-9a-f]{32}\.png$")  # 按内容寻址的文件名：32 位十六进制摘要 + .png
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+
+
+def normalize(image):
+    """统一为 BGR 三通道：mss 截图带 alpha 通道，而从文件读回的图像没有，两者应得到同一个摘要"""
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    return image
+
+
+def pixel_hash(image):
+    """按像素内容（含尺寸和通道数）计算摘要；同样的截图无论何时录制、如何编码都得到同一个摘要"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(image.shape).encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ImageStore:
+    """录制图像的内容寻址存储：文件名为像素摘要，重复的截图只保存一份。
+    脚本中的图像定位记录摘要（locator["hash"]），value 仍为文件路径，旧脚本按路径定位照常可用"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, root="recorded_images"):
+        self.root = root
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = ImageStore()
+        return cls._instance
+
+    def path(self, digest):
+        return os.path.join(self.root, f"{digest}.png")
+
+    def put(self, image):
+        """保存图像并返回 (摘要, 路径)；相同内容已存在时不重复写入"""
+        image = normalize(image)
+        digest = pixel_hash(image)
+        path = self.path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(self.root, exist_ok=True)
+                tmp = path + ".tmp.png"
+                save_image(image, tmp)
+                os.replace(tmp, path)  # 先写临时文件再改名，中途崩溃不会留下半个文件
+        return digest, path
+
+    def put_file(self, file_path):
+        """导入外部图像文件（复制，不移动原文件），返回 (摘要, 路径)"""
+        return self.put(load_image(file_path))
+
+    def resolve(self, locator):
+        """图像定位对应的文件路径：优先按摘要查找，没有摘要或文件缺失时回退到 value 中的路径"""
+        digest = locator.get("hash")
+        if digest:
+            path = self.path(digest)
+            if os.path.exists(path):
+                return path
+        return locator.get("value")
+
+    def migrate(self, directory=None, dry_run=False):
+        """把目录中按时间戳命名的旧图像合并进内容寻址存储，并改写数据库中引用它们的脚本。
+        旧文件在脚本改写完成后才删除；返回统计字典"""
+        from core.script_manager import ScriptManager
+        directory = directory or self.root
+        stats = {"files": 0, "unique": 0, "duplicates": 0, "failed": 0, "scripts": 0, "steps": 0}
+        mapping = {}  # 旧文件名 -> 摘要
+        seen = set()
+        for fname in sorted(os.listdir(directory)):
+            if not fname.lower().endswith(IMAGE_EXTS) or HASH_NAME.match(fname) or ".tmp." in fname:
+                continue
+            stats["files"] += 1
+            try:
+                image = load_image(os.path.join(directory, fname))
+            except Exception as e:
+                log(f"[图像迁移] 无法读取 {fname}：{e}")
+                stats["failed"] += 1
+                continue
+            digest = pixel_hash(image)
+            if digest in seen or os.path.exists(self.path(digest)):
+                stats["duplicates"] += 1
+            else:
+                stats["unique"] += 1
+                if not dry_run:
+                    self.put(image)
+            seen.add(digest)
+            mapping[fname] = digest
+
+        manager = ScriptManager()
+        for row in manager.list_scripts():
+            content = manager.load_by_id(row["id"])["content"]
+            changed = 0
+            for step in content if isinstance(content, list) else []:
+                locator = step.get("locator") if isinstance(step, dict) else None
+                if not isinstance(locator, dict) or locator.get("by") != "image":
+                    continue
+                digest = mapping.get(os.path.basename(str(locator.get("value", ""))))
+                if digest:
+                    locator["hash"] = digest
+                    locator["value"] = self.path(digest)
+                    changed += 1
+            if changed:
+                stats["scripts"] += 1
+                stats["steps"] += changed
+                if not dry_run:
+                    manager.update_content(row["id"], content)
+
+        if not dry_run:
+            for fname in mapping:
+                try:
+                    os.remove(os.path.join(directory, fname))
+                except OSError as e:
+                    log(f"[图像迁移] 删除旧文件失败 {fname}：{e}")
+        log(f"[图像迁移]{'（试运行）' if dry_run else ''} 扫描 {stats['files']} 个旧图像：保留 {stats['unique']} 个，"
+            f"重复 {stats['duplicates']} 个，读取失败 {stats['failed']} 个；改写 {stats['scripts']} 个脚本中的 "
+            f"{stats['steps']} 个图像定位")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把录制图像目录迁移为按内容寻址的存储，合并重复截图")
+    parser.add_argument("directory", nargs="?", default="recorded_images", help="旧图像目录")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不写文件、不改脚本")
+    args = parser.parse_args()
+    ImageStore.get_instance().migrate(args.directory, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from utils.logger import log
+
+JOURNAL_DIR = "data/journal"
+VERSION = 1
+
+
+class RecordingJournal:
+    """录制日志：每个事件追加一行 JSON（只追加不改写），后台按时间或条数批量 fsync。
+    点击截图完成后以 patch 记录回填图像定位；进程崩溃后可以从日志重新拼出脚本。
+    日志只在脚本成功保存到数据库后删除，所以目录中残留的日志都是可恢复的录制"""
+
+    def __init__(self, directory=JOURNAL_DIR, fsync_interval=1.0, fsync_batch=500):
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime("rec_%Y%m%d_%H%M%S") + f"_{int(time.time() * 1000) % 1000:03d}.jsonl"
+        self.path = os.path.join(directory, name)
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch  # 未落盘事件达到该条数时提前唤醒落盘线程
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._unsynced = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self.syncs = 0
+        self._write({"type": "header", "version": VERSION, "started": time.time()})
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-fsync", daemon=True)
+        self._flusher.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def append(self, step):
+        """追加一个步骤，返回其序号（用于之后的 patch）"""
+        with self._lock:
+            seq = self._seq
+            self._seq += 1
+            self._write({"seq": seq, "step": step})
+        return seq
+
+    def patch(self, seq, fields):
+        """回填已追加步骤的字段（例如点击截图完成后的图像定位）"""
+        with self._lock:
+            self._write({"seq": seq, "patch": fields})
+
+    def close(self):
+        """写入结束标记并落盘；日志文件保留，直到调用方确认脚本已保存后再 discard"""
+        with self._lock:
+            if self._closed:
+                return
+            self._write({"type": "end", "count": self._seq})
+            self._file.flush()
+            self._closed = True
+        self._wake.set()
+        self._flusher.join()  # 等落盘线程退出（可能正在 fsync）后再关闭文件
+        os.fsync(self._file.fileno())
+        self.syncs += 1
+        self._file.close()
+
+    def discard(self):
+        """脚本已保存，删除日志"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            log(f"[录制日志] 删除日志失败：{e}")
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_batch:
+            self._wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.fsync_interval)
+            self._wake.clear()
+            # 锁内只把缓冲写入操作系统；耗时的 fsync 在锁外进行，录制回调追加事件时不会被磁盘同步卡住
+            with self._lock:
+                if self._closed:
+                    return
+                if not self._unsynced:
+                    continue
+                self._file.flush()
+                self._unsynced = 0
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+
+
+def assemble(path):
+    """从日志拼出脚本，返回 (脚本, 是否正常结束)；末尾被截断的半行忽略，截图未完成的点击退回坐标定位"""
+    steps = {}
+    complete = False
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # 崩溃时写了一半的最后一行
+            if "step" in record:
+                steps[record["seq"]] = record["step"]
+            elif "patch" in record and record["seq"] in steps:
+                steps[record["seq"]].update(record["patch"])
+            elif record.get("type") == "end":
+                complete = True
+    script = [steps[seq] for seq in sorted(steps)]
+    for step in script:
+        locator = step.get("locator")
+        if locator and locator.get("by") == "image" and not locator.get("value"):
+            step["locator"] = {"by": "coords", "value": locator.get("fallback")}
+    return script, complete
+
+
+def pending_journals(directory=JOURNAL_DIR):
+    """尚未保存到数据库的录制日志（正常结束但保存前退出，或录制中途崩溃）"""
+    return sorted(glob.glob(os.path.join(directory, "rec_*.jsonl")))
+
+
+def recover(path, save=True, tolerance=None):
+    """恢复一个日志为脚本并保存到数据库，成功后删除日志；给出 tolerance 时同录制结束一样精简拖动轨迹。返回脚本"""
+    script, complete = assemble(path)
+    if tolerance:
+        from core.path_simplify import compact_moves
+        script, _ = compact_moves(script, tolerance)
+    if save:
+        if script:
+            from core.script_manager import ScriptManager
+            name = os.path.splitext(os.path.basename(path))[0]
+            ScriptManager().save(script, title=f"恢复的录制 {name}", tags="recovered")
+        os.remove(path)  # 没有任何事件的空日志直接删除
+    log(f"[录制日志] 恢复 {path}：{len(script)} 步，{'正常结束' if complete else '录制中断'}")
+    return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看或恢复未保存的录制日志")
+    parser.add_argument("command", choices=["list", "recover"])
+    parser.add_argument("paths", nargs="*", help="日志文件，留空则处理全部未保存日志")
+    args = parser.parse_args()
+    paths = args.paths or pending_journals()
+    for path in paths:
+        if args.command == "list":
+            script, complete = assemble(path)
+            print(f"{path}\t{len(script)} 步\t{'正常结束' if complete else '录制中断'}")
+        else:
+            recover(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import cv2
+
+
+class FramePyramid:
+    """屏幕帧的灰度金字塔，各层按需用 pyrDown 生成并缓存"""
+
+    def __init__(self, gray):
+        self.levels = [gray]
+
+    @property
+    def shape(self):
+        return self.levels[0].shape[:2]
+
+    def level(self, n):
+        while len(self.levels) <= n:
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+        return self.levels[n]
+
+
+class TemplateMatcher:
+    """由粗到细的金字塔模板匹配：先在缩小的屏幕上找候选，再在原分辨率的小窗口内精修"""
+
+    def __init__(self, confidence=0.8, max_level=2, min_side=24, coarse_slack=0.15, max_candidates=5):
+        self.confidence = confidence  # 精修阶段的最终阈值，即 image_confidence
+        self.max_level = max_level  # 最多缩小 2^max_level 倍
+        self.min_side = min_side  # 缩小后模板短边不能小于该值，否则细节丢失过多
+        self.coarse_slack = coarse_slack  # 粗匹配阈值放宽量，补偿降采样带来的得分下降
+        self.max_candidates = max_candidates
+
+    def choose_level(self, template_shape):
+        """根据模板尺寸选择粗匹配所用的金字塔层级，0 表示直接全分辨率匹配"""
+        th, tw = template_shape[:2]
+        level = 0
+        while level < self.max_level and min(th, tw) >> (level + 1) >= self.min_side:
+            level += 1
+        return level
+
+    def match(self, pyramid, template, region=None, confidence=None):
+        """在 region (left, top, width, height) 内查找灰度模板，返回 (cx, cy, score)，未命中返回 None"""
+        confidence = self.confidence if confidence is None else confidence
+        fh, fw = pyramid.shape
+        th, tw = template.shape[:2]
+        left, top, width, height = region or (0, 0, fw, fh)
+        if width < tw or height < th:
+            return None
+
+        level = self.choose_level(template.shape)
+        if level == 0:
+            return self._refine(pyramid.level(0), template, (left, top, width, height), confidence)
+
+        small_frame = pyramid.level(level)
+        small_tpl = template
+        for _ in range(level):
+            small_tpl = cv2.pyrDown(small_tpl)
+        scale = 1 << level
+        sl, st = left >> level, top >> level
+        sr = min(small_frame.shape[1], (left + width + scale - 1) >> level)
+        sb = min(small_frame.shape[0], (top + height + scale - 1) >> level)
+        crop = small_frame[st:sb, sl:sr]
+        if crop.shape[0] < small_tpl.shape[0] or crop.shape[1] < small_tpl.shape[1]:
+            return self._refine(pyramid.level(0), template, (left, top, width, height), confidence)
+
+        scores = cv2.matchTemplate(crop, small_tpl, cv2.TM_CCOEFF_NORMED)
+        radius = max(small_tpl.shape[:2]) // 2
+        best = None
+        for x, y in self._peaks(scores, confidence - self.coarse_slack, radius):
+            # 候选点映射回原分辨率，四周留出 2 个粗层像素的余量再精修
+            fx, fy = (sl + x) * scale, (st + y) * scale
+            margin = 2 * scale
+            wl, wt = max(left, fx - margin), max(top, fy - margin)
+            wr = min(left + width, fx + tw + margin)
+            wb = min(top + height, fy + th + margin)
+            hit = self._refine(pyramid.level(0), template, (wl, wt, wr - wl, wb - wt), confidence)
+            if hit and (best is None or hit[2] > best[2]):
+                best = hit
+        return best
+
+    def _peaks(self, scores, threshold, radius):
+        """取得分最高的若干个候选点，相邻候选做非极大值抑制"""
+        scores = scores.copy()
+        peaks = []
+        for _ in range(self.max_candidates):
+            _, score, _, (x, y) = cv2.minMaxLoc(scores)
+            if score < threshold:
+                break
+            peaks.append((x, y))
+            scores[max(0, y - radius):y + radius + 1, max(0, x - radius):x + radius + 1] = -1
+        return peaks
+
+    def _refine(self, frame, template, region, confidence):
+        left, top, width, height = region
+        th, tw = template.shape[:2]
+        crop = frame[top:top + height, left:left + width]
+        if crop.shape[0] < th or crop.shape[1] < tw:
+            return None
+        scores = cv2.matchTemplate(crop, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(scores)
+        if score < confidence:
+            return None
+        return left + x + tw // 2, top + y + th // 2, float(score)
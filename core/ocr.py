@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from core.frame_diff import frame_signature, changed_tiles, dirty_regions
+
+
+def ocr_words(gray, region=None):
+    """对灰度帧（或其中一块区域）做 OCR，返回 (文本, left, top, width, height) 列表，坐标为整屏坐标"""
+    import pytesseract  # 按需导入：不用文本定位的回放不必加载 OCR
+    left, top = 0, 0
+    if region:
+        left, top, width, height = region
+        gray = gray[top:top + height, left:left + width]
+    data = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data["text"]):
+        if text and text.strip():
+            words.append((text, data["left"][i] + left, data["top"][i] + top, data["width"][i], data["height"][i]))
+    return words
+
+
+def split_tiles(region, tile_size, overlap):
+    """把区域切成核心区互不重叠的图块，每块四周再带 overlap 像素的重叠边，返回 [(识别区域, 核心区域)]"""
+    left, top, width, height = region
+    tiles = []
+    for y in range(top, top + height, tile_size):
+        for x in range(left, left + width, tile_size):
+            core = (x, y, min(tile_size, left + width - x), min(tile_size, top + height - y))
+            cl, ct = max(left, x - overlap), max(top, y - overlap)
+            cr = min(left + width, x + core[2] + overlap)
+            cb = min(top + height, y + core[3] + overlap)
+            tiles.append(((cl, ct, cr - cl, cb - ct), core))
+    return tiles
+
+
+def _init_worker():
+    # 每个子进程只让 Tesseract 用一个线程，避免多进程叠加 OpenMP 线程造成超额订阅
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _ocr_tile(tile, offset, core):
+    """子进程中识别一个图块；被重叠边切到的词由中心所在的图块负责，其余图块丢弃以去重"""
+    cl, ct, cw, ch = core
+    words = []
+    for text, x, y, w, h in ocr_words(tile):
+        x, y = x + offset[0], y + offset[1]
+        if cl <= x + w // 2 < cl + cw and ct <= y + h // 2 < ct + ch:
+            words.append((text, x, y, w, h))
+    return words
+
+
+def _intersects(word, region):
+    _, x, y, w, h = word
+    left, top, width, height = region
+    return x < left + width and left < x + w and y < top + height and top < y + h
+
+
+def _find_word(words, text):
+    for word, left, top, width, height in words:
+        if text in word:
+            return left + width // 2, top + height // 2
+    return None
+
+
+class OcrIndex:
+    """OCR 结果索引：按帧摘要缓存整屏词框；画面变化时只对变化的图块重新 OCR 并合并回索引"""
+
+    def __init__(self, tile_size=256, pad=32, max_frames=8, workers=0, parallel_tile=640, overlap=48):
+        self.tile_size = tile_size
+        self.pad = pad  # 变化区域向外扩展的像素，避免把边缘上的字切断
+        self.max_frames = max_frames
+        self.workers = workers or os.cpu_count() or 1  # 0 表示按 CPU 核数，1 表示不并行
+        self.parallel_tile = parallel_tile  # 并行识别时的图块边长
+        self.overlap = overlap  # 并行图块之间的重叠宽度，应大于一行文字的高度
+        self._pool = None
+        self._cache = OrderedDict()  # 帧摘要 -> 词框列表
+        self._last_gray = None  # 最近一次 OCR 的帧，作为增量比较的基准
+        self._last_words = None
+        self._partial = None  # 提前返回的整屏识别：(帧摘要, 帧, 已完成的词框, 仍在识别的图块)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.full_runs = 0
+        self.tile_runs = 0
+        self.short_circuits = 0
+
+    def words(self, gray):
+        """返回该帧的全部词框：相同画面直接查缓存，否则只识别与上次 OCR 帧不同的区域"""
+        with self._lock:
+            self._settle_partial()
+            return self._words(gray, frame_signature(gray))
+
+    def find(self, gray, text):
+        """查找包含 text 的第一个词，返回其中心坐标，找不到返回 None"""
+        signature = frame_signature(gray)
+        with self._lock:
+            self._settle_partial()
+            if signature not in self._cache and self._needs_full_run(gray):
+                # 没有可增量比较的基准帧：并行整屏识别，目标文本一出现就提前返回
+                words, pending = self._recognize(gray, None, target=text)
+                self.full_runs += 1
+                if pending:
+                    # 其余图块继续在进程池中识别，下次查询时收齐并写入缓存，同一画面不再重新整屏识别
+                    self.short_circuits += 1
+                    self._partial = (signature, gray, words, pending)
+                    return _find_word(words, text)
+                self._store(gray, signature, words)
+            return _find_word(self._words(gray, signature), text)
+
+    def close(self):
+        """关闭并行识别用的进程池"""
+        self._partial = None
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _settle_partial(self):
+        """收齐上次提前返回时仍在识别的图块，把完整词框写入缓存并作为增量识别的基准"""
+        if self._partial is None:
+            return
+        signature, gray, words, pending = self._partial
+        self._partial = None
+        for future in wait(pending).done:
+            try:
+                words.extend(future.result())
+            except Exception:
+                return  # 图块识别失败，结果不完整，不写入缓存
+        self._store(gray, signature, words)
+
+    def _needs_full_run(self, gray):
+        return self._last_gray is None or self._last_gray.shape != gray.shape
+
+    def _words(self, gray, signature):
+        if signature in self._cache:
+            self._cache.move_to_end(signature)
+            self.hits += 1
+            return self._cache[signature]
+
+        if self._needs_full_run(gray):
+            words, _ = self._recognize(gray, None)
+            self.full_runs += 1
+        else:
+            mask = changed_tiles(self._last_gray, gray, self.tile_size)
+            dirty = dirty_regions(mask, self.tile_size, gray.shape)
+            # 像素未变化的旧词继续有效；与变化区域相交的旧词由新识别结果替换
+            words = [w for w in self._last_words if not any(_intersects(w, r) for r in dirty)]
+            seen = set()
+            for region in dirty:
+                # 识别时向外扩展，避免把跨图块边缘的字切断；只保留与变化区域相交的新词
+                new_words, _ = self._recognize(gray, self._expand(region, gray.shape))
+                for word in new_words:
+                    key = (word[0], word[1] + word[3] // 2, word[2] + word[4] // 2)
+                    if _intersects(word, region) and key not in seen:  # 相邻区域扩展边重叠时去重
+                        seen.add(key)
+                        words.append(word)
+            self.tile_runs += len(dirty)
+        self._store(gray, signature, words)
+        return words
+
+    def _store(self, gray, signature, words):
+        self._last_gray = gray
+        self._last_words = words
+        self._cache[signature] = words
+        while len(self._cache) > self.max_frames:
+            self._cache.popitem(last=False)
+
+    def _recognize(self, gray, region, target=None):
+        """识别区域（None 为整帧），返回 (词框, 仍在识别的图块)；区域较大时切块并行，
+        给定 target 时命中即返回，其余图块不取消，由调用方稍后收齐"""
+        h, w = gray.shape[:2]
+        region = region or (0, 0, w, h)
+        tiles = split_tiles(region, self.parallel_tile, self.overlap)
+        if self.workers <= 1 or len(tiles) < 2:
+            return ocr_words(gray, region), set()
+
+        if self._pool is None:
+            # 回放进程里已有热键监听、截图写盘、流水线等线程（GUI 下还有 Qt 线程），fork 会把它们持有的锁带进子进程，
+            # 可能导致子进程死锁；与 suite_runner 一样用 spawn 启动干净的子进程
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker)
+        pending = set()
+        for (left, top, width, height), core in tiles:
+            tile = gray[top:top + height, left:left + width].copy()
+            pending.add(self._pool.submit(_ocr_tile, tile, (left, top), core))
+        words = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                words.extend(future.result())
+            if target is not None and pending and _find_word(words, target):
+                return words, pending
+        return words, set()
+
+    def _expand(self, region, shape):
+        left, top, width, height = region
+        h, w = shape[:2]
+        new_left, new_top = max(0, left - self.pad), max(0, top - self.pad)
+        return (new_left, new_top,
+                min(w, left + width + self.pad) - new_left,
+                min(h, top + height + self.pad) - new_top)
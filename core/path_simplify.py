@@ -0,0 +1,58 @@
+import math
+
+
+def douglas_peucker(points, tolerance):
+    """Douglas–Peucker 折线简化，返回需要保留的点的下标（升序，首尾必定保留）"""
+    n = len(points)
+    if n <= 2:
+        return list(range(n))
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]  # 用栈代替递归，长轨迹不会触发递归深度限制
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        x2, y2 = points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        max_dist, index = -1.0, None
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length == 0:
+                dist = math.hypot(px - x1, py - y1)
+            else:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / length
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i in range(n) if keep[i]]
+
+
+def compact_moves(script, tolerance=2.0):
+    """精简脚本中连续的 move 步骤：每段轨迹按像素容差简化，保留首尾及转折点。
+    被保留的步骤沿用原时间戳，所以回放时各段的总耗时不变。返回 (新脚本, 移除的步骤数)"""
+    result = []
+    removed = 0
+    run = []
+
+    def flush():
+        nonlocal removed
+        if not run:
+            return
+        points = [tuple(step["position"]) for step in run]
+        kept = douglas_peucker(points, tolerance)
+        result.extend(run[i] for i in kept)
+        removed += len(run) - len(kept)
+        run.clear()
+
+    for step in script:
+        if isinstance(step, dict) and step.get("action") == "move" and "position" in step and "locator" not in step:
+            run.append(step)
+        else:
+            flush()
+            result.append(step)
+    flush()
+    return result, removed
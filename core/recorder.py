@@ -1,34 +1,128 @@
 from pynput import mouse, keyboard
 import threading
 import time
-import pyautogui
-import os
+import queue
+from core.capture import create_backend, FrameRing, crop, clip_region
+from core.image_store import ImageStore
+from core.path_simplify import compact_moves
+from core.journal import RecordingJournal
+from core.event_buffer import EventBuffer
 from utils.logger import log  # 假设有日志模块
 
+
+class CaptureWorker:
+    """录制时的区域截图工作线程：pynput 回调只投递请求（附带按下前帧上裁好的模板），截图和写盘在这里完成，
+    完成后通过 on_result 回填步骤的图像摘要和路径；队列有上限，满了就丢弃截图，让该步骤退回坐标定位，绝不阻塞输入钩子"""
+
+    def __init__(self, capture_fn, on_result, max_pending=32):
+        self.capture_fn = capture_fn  # region, 已裁好的模板或 None -> 图像定位字段 {"hash", "value"}
+        self.on_result = on_result  # 步骤序号, 图像定位字段（截图失败为 None）
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name="record-capture", daemon=True)
+        self.stats = {"enqueued": 0, "completed": 0, "failed": 0, "dropped": 0,
+                      "max_depth": 0, "total_latency": 0.0, "max_latency": 0.0}
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, seq, region, image=None):
+        """投递一个截图请求，立即返回；队列已满时返回 False，调用方应改用坐标定位"""
+        try:
+            self.queue.put_nowait((seq, region, time.time(), image))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.queue.qsize())
+        return True
+
+    def finish(self, timeout=10):
+        """处理完队列中剩余的请求后退出；超时仍未完成的步骤由调用方处理"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            seq, region, requested, image = item
+            try:
+                fields = self.capture_fn(region, image)
+                self.stats["completed"] += 1
+            except Exception as e:
+                log(f"[录制截图] 截图失败，该步骤改用坐标定位：{e}")
+                fields = None
+                self.stats["failed"] += 1
+            self.on_result(seq, fields)
+            latency = time.time() - requested
+            self.stats["total_latency"] += latency
+            self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+
+    def summary(self):
+        st = self.stats
+        done = st["completed"] + st["failed"]
+        avg = st["total_latency"] / done * 1000 if done else 0
+        return (f"[录制截图] 投递 {st['enqueued']}，完成 {st['completed']}，失败 {st['failed']}，"
+                f"队列满丢弃 {st['dropped']}，最大排队 {st['max_depth']}，"
+                f"平均延迟 {avg:.0f}ms，最大延迟 {st['max_latency'] * 1000:.0f}ms")
+
+
+def use_coords(step):
+    """没有拿到截图的点击步骤退回为坐标定位"""
+    step["locator"] = {"by": "coords", "value": step["locator"]["fallback"]}
+
+
 class Recorder:
     def __init__(self, config=None):
-        self.script = []  # 保存所有操作的列表
+        self.script = []  # 停止录制后由事件缓冲导出的脚本
+        self.events = EventBuffer()  # 录制中的事件按列紧凑存放，停止时才导出为脚本
+        self.journal = None  # 同时追加到磁盘日志，崩溃后可恢复
+        self._pending = {}  # 步骤序号 -> 等待截图回填的点击步骤
         self.lock = threading.Lock()  # 用于确保线程安全
         self.mouse_listener = None
         self.keyboard_listener = None
         self.recording = False  # 录制状态
         self.is_recording = False  # 控制是否在录制状态
         self.stop_event = threading.Event()  # 停止录制的事件
-        self.image_save_path = "recorded_images/"
+        self.image_store = ImageStore.get_instance()  # 按像素摘要保存，重复点击同一按钮只存一份
+        self.image_save_path = self.image_store.root
         self.config = config or {}
         self.image_region_size = self.config.get("image_region_size", 100)  # ✅ 默认100
+        self.capture = create_backend(self.config)  # 截图后端，与回放共用 core.capture
+        self.compact_moves = self.config.get("compact_moves", True)  # 停止录制时精简拖动轨迹
+        self.move_tolerance = self.config.get("move_tolerance", 2.0)  # 轨迹简化的像素容差
+        self.capture_queue_size = self.config.get("record_capture_queue", 32)  # 待处理截图请求上限
+        self.capture_worker = None
+        self.journal_fsync_interval = self.config.get("record_journal_fsync", 1.0)  # 日志落盘间隔（秒）
+        # 按下前帧缓冲：后台定时截整屏，点击模板从按下之前的最后一帧裁剪；fps 为 0 时退回松开后实时截图
+        self.frame_fps = self.config.get("record_frame_fps", 10)
+        self.frame_buffer_bytes = self.config.get("record_frame_buffer_mb", 64) * 1024 * 1024
+        self.frame_ring = None
+        self.down_frame = None  # 鼠标按下时缓冲中最新的一帧（按下之前截取）
+        self.ring_hits = 0
+        self.live_grabs = 0
         self.dragging = False
         self.drag_start = None
         self.last_move = None
-        os.makedirs(self.image_save_path, exist_ok=True)  # 创建图像保存目录
 
     def start(self):
         """开始录制并启动倒计时"""
         with self.lock:  # 线程安全
-            self.script.clear()
+            self.script = []
+            self._pending.clear()
+            self.events = EventBuffer()
+            self.journal = RecordingJournal(fsync_interval=self.journal_fsync_interval)
+        log(f"[录制日志] 事件写入 {self.journal.path}")
         self.is_recording = True
         self.recording = True
         self.stop_event.clear()  # 清除停止事件标志
+        self.ring_hits = self.live_grabs = 0
+        if self.frame_fps > 0:
+            self.frame_ring = FrameRing(self.capture, self.frame_fps, self.frame_buffer_bytes)
+            self.frame_ring.start()
+        self.capture_worker = CaptureWorker(self.capture_image, self._on_capture, self.capture_queue_size)
+        self.capture_worker.start()
 
         # 倒计时2秒
         print("录制将在2秒后开始...")
@@ -56,22 +150,92 @@ class Recorder:
         print("开始录制...")
 
     def stop(self):
-        """停止录制并返回脚本"""
+        """停止录制，由事件缓冲导出脚本并返回；日志在脚本保存后由 discard_journal 删除"""
         print("录制停止")
         self.is_recording = False
         self.recording = False
         self.stop_event.set()  # 设置停止事件标志
         if self.mouse_listener: self.mouse_listener.stop()
         if self.keyboard_listener: self.keyboard_listener.stop()
+        worker, self.capture_worker = self.capture_worker, None  # ESC 和界面按钮都可能触发停止
+        if worker:
+            worker.finish()
+            for seq in list(self._pending):
+                self._on_capture(seq, None)  # 等待超时仍未完成的截图
+            log(worker.summary())
+        ring, self.frame_ring = self.frame_ring, None
+        self.down_frame = None
+        if ring:
+            ring.stop()
+            log(f"[帧缓冲] 后台截屏 {ring.grabs} 帧，淘汰 {ring.evictions} 帧；"
+                f"模板取自按下前帧 {self.ring_hits} 次，实时截图 {self.live_grabs} 次")
+        with self.lock:
+            journal = self.journal
+            if journal is None or journal.closed:
+                return self.script  # 已经停止过（ESC 之后界面按钮再次停止）
+            journal.close()
+            events = self.events
+        log(f"[录制日志] 共 {len(events)} 步，落盘 {journal.syncs} 次；"
+            f"事件缓冲占用 {events.nbytes() / 1024:.0f}KB")
+        script = events.to_script()
+        if self.compact_moves:
+            script, removed = compact_moves(script, self.move_tolerance)
+            if removed:
+                log(f"[轨迹精简] 移除 {removed} 个 move 步骤，剩余 {len(script)} 步")
+        self.script = script
         return self.script
 
-    def capture_image(self, region=None):
-        """捕获图像并保存"""
-        image_path = f"{self.image_save_path}{time.time()}.png"
-        screenshot = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
-        screenshot.save(image_path)
+    def discard_journal(self):
+        """脚本已保存到数据库后调用，删除本次录制的日志"""
+        journal, self.journal = self.journal, None
+        if journal:
+            journal.discard()
+
+    def _record(self, step):
+        """把一个事件追加到事件缓冲和录制日志，返回其序号；鼠标和键盘回调在不同线程，两边序号靠锁保持一致"""
+        with self.lock:
+            journal = self.journal
+            if journal is None or journal.closed:
+                return None
+            journal.append(step)
+            return self.events.append(step)
+
+    def _on_capture(self, seq, fields):
+        """截图完成（或失败）后回填点击步骤的定位，并以 patch 记录写入日志"""
+        with self.lock:
+            step = self._pending.pop(seq, None)
+            if step is None:
+                return
+            if fields:
+                step["locator"].update(fields)
+            else:
+                use_coords(step)
+            self.events.patch(seq, {"locator": step["locator"]})
+            if self.journal and not self.journal.closed:
+                self.journal.patch(seq, {"locator": step["locator"]})
+
+    def capture_image(self, region, image=None):
+        """截取以点击点为中心的 region 存入图像库，返回图像定位字段；给出 image（按下前帧上裁好的模板）时直接保存，否则实时截图。
+        靠近屏幕边缘时模板被截掉一部分，点击点不再是模板中心，此时记录点击点在模板内的位置 anchor"""
+        if image is not None:
+            self.ring_hits += 1
+        else:
+            clipped = clip_region(region, self.capture.screen_size())
+            if clipped is None:
+                raise ValueError(f"截图区域在屏幕之外：{region}")
+            image = self.capture.grab(clipped)
+            self.live_grabs += 1
+        if image.size == 0:
+            raise ValueError(f"截图区域在屏幕之外：{region}")
+        digest, image_path = self.image_store.put(image)
         print(f"图像已保存: {image_path}")
-        return image_path
+        fields = {"hash": digest, "value": image_path}
+        left, top, width, height = region
+        # 裁剪只截掉超出屏幕的部分，模板左上角为 (max(0, left), max(0, top))
+        anchor = [left + width // 2 - max(0, left), top + height // 2 - max(0, top)]
+        if anchor != [image.shape[1] // 2, image.shape[0] // 2]:
+            fields["anchor"] = anchor
+        return fields
 
     def on_click(self, x, y, button, pressed):
         if not self.recording:
@@ -80,14 +244,17 @@ class Recorder:
         if pressed:
             self.dragging = True
             self.drag_start = (x, y)
+            # 只取引用不复制：缓冲中按下之前的最新一帧。松开时工作线程才处理截图，
+            # 那时该帧可能已被淘汰（4K 下 64MB 只够存一帧），所以必须在按下时就拿住
+            ring = self.frame_ring
+            self.down_frame = ring.before(time.time()) if ring else None
 
-            with self.lock:
-                self.script.append({
-                    "action": "mouseDown",
-                    "position": [x, y],
-                    "button": button.name,
-                    "time": time.time()
-                })
+            self._record({
+                "action": "mouseDown",
+                "position": [x, y],
+                "button": button.name,
+                "time": time.time()
+            })
 
         else:
             self.dragging = False
@@ -100,28 +267,37 @@ class Recorder:
                           y - self.image_region_size // 2,
                           self.image_region_size,
                           self.image_region_size)
-                image_path = self.capture_image(region)
-
-                with self.lock:
-                    self.script.append({
-                        "action": "click",
-                        "locator": {
-                            "by": "image",
-                            "value": image_path,
-                            "fallback": [x, y]
-                        },
-                        "button": button.name,
-                        "time": time.time()
-                    })
+                # 截图在工作线程中完成，图像路径稍后回填；这里只投递请求，不阻塞输入钩子
+                step = {
+                    "action": "click",
+                    "locator": {
+                        "by": "image",
+                        "value": None,
+                        "fallback": [x, y]
+                    },
+                    "button": button.name,
+                    "time": time.time()
+                }
+                seq = self._record(step)
+                if seq is not None:
+                    with self.lock:
+                        self._pending[seq] = step
+                        worker = self.capture_worker
+                    # 在回调中裁出模板（约 40KB 的拷贝），队列里不持有整屏帧
+                    frame, self.down_frame = self.down_frame, None
+                    image = crop(frame, region).copy() if frame is not None else None
+                    # 录制正在停止或队列已满时，该步骤直接退回坐标定位
+                    if not worker or not worker.submit(seq, region, image):
+                        self._on_capture(seq, None)
 
             if dist >= 10:  # 是拖动
-                with self.lock:
-                    self.script.append({
-                        "action": "mouseUp",
-                        "position": [x, y],
-                        "button": button.name,
-                        "time": time.time()
-                    })
+                self.down_frame = None
+                self._record({
+                    "action": "mouseUp",
+                    "position": [x, y],
+                    "button": button.name,
+                    "time": time.time()
+                })
 
             self.drag_start = None
 
@@ -129,24 +305,22 @@ class Recorder:
         """监听鼠标滚轮"""
         if not self.recording:
             return
-        with self.lock:
-            self.script.append({
-                "action": "scroll",
-                "position": [x, y],
-                "delta": dy,
-                "time": time.time()
-            })
+        self._record({
+            "action": "scroll",
+            "position": [x, y],
+            "delta": dy,
+            "time": time.time()
+        })
 
     def on_move(self, x, y):
         if not self.recording or not self.dragging:
             return
         self.last_move = (x, y)
-        with self.lock:
-            self.script.append({
-                "action": "move",
-                "position": [x, y],
-                "time": time.time()
-            })
+        self._record({
+            "action": "move",
+            "position": [x, y],
+            "time": time.time()
+        })
 
     def on_key_press(self, key):
         """监听键盘按键"""
@@ -160,12 +334,11 @@ class Recorder:
         if key_val == 'esc':  # 停止录制
             self.stop()
         else:
-            with self.lock:
-                self.script.append({
-                    "action": "keyboard",
-                    "key": key_val,
-                    "time": time.time()
-                })
+            self._record({
+                "action": "keyboard",
+                "key": key_val,
+                "time": time.time()
+            })
 
     def insert_drag_moves(self, start, end, interval=20):
         """为拖动插入平滑 move 步骤"""
@@ -179,7 +352,7 @@ class Recorder:
             t = i / steps
             x = int(x1 + dx * t)
             y = int(y1 + dy * t)
-            self.script.append({
+            self._record({
                 "action": "move",
                 "position": [x, y],
                 "time": time.time()
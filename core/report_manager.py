@@ -0,0 +1,47 @@
+from core.db import Database
+from core.telemetry import summarize
+
+
+class ReportManager:
+    def __init__(self):
+        self.db = Database.get_instance()
+
+    def save(self, report):
+        """保存一次回放的报告（含分步计时），返回报告 id"""
+        c = self.db.execute("""
+                            INSERT INTO reports(script_id, summary, success_rate, duration, detail, replay_mode)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            """, (report["script_id"], report["summary"], report["success_rate"],
+                                  report["duration"], report["detail"], report.get("replay_mode")))
+        report_id = c.lastrowid
+        if report.get("timings"):
+            self.save_timings(report_id, report["timings"])
+        if report.get("artifacts"):
+            self.save_artifacts(report_id, report["artifacts"])
+        return report_id
+
+    def save_artifacts(self, report_id, records):
+        self.db.executemany("""
+                            INSERT OR REPLACE INTO report_artifacts(report_id, step_index, path, hash, reason, status)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            """, [(report_id, r["step_index"], r["path"], r["hash"], r["reason"], r["status"])
+                                  for r in records])
+
+    def artifacts(self, report_id):
+        return self.db.query("SELECT * FROM report_artifacts WHERE report_id=? ORDER BY step_index", (report_id,))
+
+    def save_timings(self, report_id, rows):
+        self.db.executemany("""
+                            INSERT OR REPLACE INTO step_timings(report_id, step_index, action, capture, locate,
+                                                                inject, sleep, total, attempts, success)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            """, [(report_id, r["step_index"], r["action"], r["capture"], r["locate"],
+                                   r["inject"], r["sleep"], r["total"], r["attempts"], r["success"])
+                                  for r in rows])
+
+    def step_timings(self, report_id):
+        return self.db.query("SELECT * FROM step_timings WHERE report_id=? ORDER BY step_index", (report_id,))
+
+    def timing_stats(self, report_id):
+        """按动作类型统计该报告各阶段耗时的 p50/p95"""
+        return summarize(self.step_timings(report_id))
@@ -0,0 +1,133 @@
+import threading
+import time
+from utils.logger import log
+
+
+class RunStopped(Exception):
+    """回放被停止，用于立即跳出正在进行的等待或重试"""
+
+
+class RunControl:
+    """回放控制：暂停/恢复/停止基于条件变量，所有等待都可以被立即打断；两条回放路径共用"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.paused = False
+        self.stopped = False
+        self.last_injected = 0.0  # 最近一次注入键盘输入的时间，热键服务据此忽略回放自己打出的按键
+
+    def reset(self):
+        with self._cond:
+            self.paused = False
+            self.stopped = False
+            self._cond.notify_all()
+
+    def pause(self):
+        with self._cond:
+            self.paused = True
+            self._cond.notify_all()
+        log("暂停回放")
+
+    def resume(self):
+        with self._cond:
+            self.paused = False
+            self._cond.notify_all()
+        log("恢复回放")
+
+    def toggle_pause(self):
+        if self.paused:
+            self.resume()
+        else:
+            self.pause()
+
+    def stop(self):
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+        log("停止回放")
+
+    def checkpoint(self):
+        """暂停时阻塞直到恢复；已停止则抛出 RunStopped"""
+        with self._cond:
+            while self.paused and not self.stopped:
+                self._cond.wait()
+            if self.stopped:
+                raise RunStopped()
+
+    def sleep(self, seconds):
+        """可中断的等待：暂停期间不计时，停止时立即抛出 RunStopped"""
+        remaining = seconds
+        with self._cond:
+            while True:
+                if self.stopped:
+                    raise RunStopped()
+                if self.paused:
+                    self._cond.wait()
+                    continue
+                if remaining <= 0:
+                    return
+                start = time.monotonic()
+                self._cond.wait(remaining)
+                remaining -= time.monotonic() - start
+
+    def mark_injected(self):
+        self.last_injected = time.time()
+
+
+class HotkeyService:
+    """进程内唯一的全局热键监听：ESC/S 停止，P 暂停/恢复；只在有回放进行时监听"""
+    _instance = None
+    _instance_lock = threading.Lock()
+    INJECT_GRACE = 0.3  # 注入键盘输入后这段时间内的按键视为回放自己打出的，不当作热键
+
+    def __init__(self):
+        self._controls = []
+        self._listener = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = HotkeyService()
+        return cls._instance
+
+    def attach(self, control):
+        """回放开始时登记控制对象，必要时启动监听"""
+        with self._lock:
+            if control not in self._controls:
+                self._controls.append(control)
+            if self._listener is None:
+                try:
+                    from pynput import keyboard
+                    self._listener = keyboard.Listener(on_press=self._on_press)
+                    self._listener.start()
+                except Exception as e:  # 无显示环境（CI、Xvfb 以外）下没有键盘钩子，热键不可用
+                    log(f"[热键] 监听启动失败，热键不可用：{e}")
+
+    def detach(self, control):
+        """回放结束时注销，没有进行中的回放时停止监听"""
+        with self._lock:
+            if control in self._controls:
+                self._controls.remove(control)
+            if not self._controls and self._listener is not None:
+                self._listener.stop()
+                self._listener = None
+
+    def _on_press(self, key):
+        from pynput import keyboard
+        with self._lock:
+            controls = [c for c in self._controls if time.time() - c.last_injected > self.INJECT_GRACE]
+        if not controls:
+            return
+        if key == keyboard.Key.esc:
+            action = "stop"
+        else:
+            char = getattr(key, "char", None)
+            action = {"s": "stop", "p": "toggle_pause"}.get(char)
+        for control in controls:
+            if action == "stop":
+                control.stop()
+            elif action == "toggle_pause":
+                control.toggle_pause()
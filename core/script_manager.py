@@ -1,5 +1,7 @@
 import json
+import re
 from core.db import Database
+from core.step_plan import invalidate_plan
 
 class ScriptManager:
     def __init__(self):
@@ -22,11 +24,18 @@ class ScriptManager:
                                 tags    = ?
                             WHERE id = ?
                             """, (json.dumps(script), title, tags, script_id))
+            invalidate_plan(script_id)
             from utils.logger import log
             log(f"脚本 [{title}] 更新成功")
         except Exception as e:
             log(f"更新脚本失败: {e}")
 
+    def update_content(self, script_id, script):
+        """只改写脚本内容（例如批量迁移图像引用），标题和标签不变"""
+        self.db.execute("UPDATE scripts SET content = ? WHERE id = ?",
+                        (json.dumps(script, ensure_ascii=False), script_id))
+        invalidate_plan(script_id)
+
     def load_latest(self):
         # 查询最新脚本的 id 和 content
         rows = self.db.query("SELECT id, content FROM scripts ORDER BY id DESC LIMIT 1")
@@ -53,6 +62,16 @@ class ScriptManager:
         rows = self.db.query("SELECT id, title, tags,created_at FROM scripts ORDER BY id DESC")
         return [dict(r) for r in rows]
 
+    def list_by_tags(self, tags):
+        """列出带有任一指定标签的脚本（标签以空格或逗号分隔）"""
+        wanted = set(tags)
+        result = []
+        for s in self.list_scripts():
+            script_tags = set(t for t in re.split(r"[\s,，]+", s.get("tags") or "") if t)
+            if script_tags & wanted:
+                result.append(s)
+        return result
+
     def import_from_file(self, filepath):
         if filepath.endswith(".json"):
             with open(filepath, "r", encoding="utf-8") as f:
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from utils.logger import log
+
+# 需要定位目标的动作；其余动作（键盘、等待类）不需要 locator
+LOCATOR_ACTIONS = ("click", "move", "assert", "scroll")
+
+
+class Step:
+    """编译后的单个步骤：字段、定位方式和处理函数都在编译时解析好，回放时不再查字典"""
+    __slots__ = ("index", "action", "handler", "locator", "position", "end_position",
+                 "button", "key", "delta", "delay", "time", "options", "error", "raw")
+
+    def __init__(self, index, action, raw):
+        self.index = index
+        self.action = action
+        self.raw = raw  # 原始步骤，只读，用于报告和错误截图
+        self.handler = None
+        self.locator = None
+        self.position = None
+        self.end_position = None
+        self.button = "left"
+        self.key = None
+        self.delta = 0
+        self.delay = 0.0  # 与上一步录制时间的间隔（秒）
+        self.time = None
+        self.options = None  # 等待类动作的参数（region / timeout / threshold 等）
+        self.error = None  # 编译期发现的问题，回放到该步时报错
+
+
+class StepPlan:
+    """编译后的回放计划"""
+    __slots__ = ("script_id", "steps", "errors", "fingerprint")
+
+    def __init__(self, script_id, steps, fingerprint):
+        self.script_id = script_id
+        self.steps = steps
+        self.errors = [s for s in steps if s.error]
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.steps)
+
+
+def _click(ex, s): ex.click(s.locator, s.button)
+def _move(ex, s): ex.move(s.locator)
+def _scroll(ex, s): ex.scroll(s.position, s.delta)
+def _keyboard(ex, s): ex.input_key(s.key)
+def _assert(ex, s): ex.assert_exists(s.locator)
+def _drag(ex, s): ex.mouse_drag(s.position, s.end_position)
+def _mouse_down(ex, s): ex.mouse_down(s.position, s.button)
+def _mouse_up(ex, s): ex.mouse_up(s.position, s.button)
+def _wait_until_stable(ex, s): ex.wait_until_stable(s.options)
+def _wait_for_change(ex, s): ex.wait_for_change(s.options)
+
+
+def _invalid(ex, s):
+    raise s.error
+
+
+HANDLERS = {
+    "click": _click,
+    "move": _move,
+    "scroll": _scroll,
+    "keyboard": _keyboard,
+    "assert": _assert,
+    "drag": _drag,
+    "mouseDown": _mouse_down,
+    "mouseUp": _mouse_up,
+    "wait_until_stable": _wait_until_stable,
+    "wait_for_change": _wait_for_change,
+}
+
+
+def _compile_step(index, raw, last_time):
+    if not isinstance(raw, dict) or "action" not in raw:
+        step = Step(index, "invalid", raw)  # 占位动作名，报告和分步计时中不出现空值
+        step.error = ValueError("步骤格式错误，缺少 action 字段")
+        step.handler = _invalid
+        return step
+
+    action = raw["action"]
+    step = Step(index, action, raw)
+    step.button = raw.get("button", "left")
+    step.time = raw.get("time")
+    if last_time is not None and step.time is not None:
+        step.delay = max(0.0, step.time - last_time)
+
+    # 自动补 locator：不修改调用方的原始脚本
+    locator = raw.get("locator")
+    position = raw.get("position")
+    if position is None and "x" in raw and "y" in raw:
+        position = [raw["x"], raw["y"]]
+    if locator is None and position is not None:
+        locator = {"by": "coords", "value": position}
+    step.locator = locator
+    step.position = position
+
+    try:
+        if action not in HANDLERS:
+            raise ValueError(f"未知操作类型：{action}")
+        if action in LOCATOR_ACTIONS and not isinstance(locator, dict):
+            raise ValueError("无 locator 且无坐标信息，无法执行")
+        if isinstance(locator, dict) and locator.get("by") not in ("coords", "image", "text"):
+            raise ValueError(f"不支持的定位方式: {locator.get('by')}")
+        if action == "scroll":
+            step.delta = raw["delta"]
+            if step.position is None:
+                step.position = locator["value"]
+        elif action == "keyboard":
+            step.key = raw["key"]
+        elif action == "drag":
+            step.position = raw["start_position"]
+            step.end_position = raw["end_position"]
+        elif action in ("mouseDown", "mouseUp") and step.position is None:
+            raise ValueError(f"{action} 缺少 position")
+        elif action in ("wait_until_stable", "wait_for_change"):
+            step.options = {k: v for k, v in raw.items() if k not in ("action", "time")}
+        step.handler = HANDLERS[action]
+    except KeyError as e:
+        step.error = ValueError(f"步骤缺少字段：{e}")
+    except (ValueError, TypeError) as e:
+        step.error = e
+    if step.error:
+        step.handler = _invalid
+    return step
+
+
+def compile_script(script, script_id=None):
+    """校验并编译脚本为 StepPlan；有 script_id 时结果会被缓存，重复回放跳过校验和规范化"""
+    fingerprint = _fingerprint(script)
+    if script_id is not None:
+        plan = _cache.get(script_id, fingerprint)
+        if plan:
+            return plan
+
+    steps = []
+    last_time = None
+    for index, raw in enumerate(script or []):
+        step = _compile_step(index, raw, last_time)
+        if step.time is not None:
+            last_time = step.time
+        steps.append(step)
+    plan = StepPlan(script_id, steps, fingerprint)
+    if plan.errors:
+        log(f"[编译] 脚本 {script_id} 有 {len(plan.errors)} 个无效步骤，将在回放到该步时报错")
+    if script_id is not None:
+        _cache.put(script_id, plan)
+    return plan
+
+
+def invalidate_plan(script_id):
+    """脚本内容被修改后丢弃其缓存的编译结果"""
+    _cache.pop(script_id)
+
+
+def _fingerprint(script):
+    # 序列化内容的摘要：中间步骤被改写（例如另一个进程迁移了图像路径）也能发现，成本远低于重新编译
+    content = json.dumps(script, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _PlanCache:
+    def __init__(self, max_plans=32):
+        self.max_plans = max_plans
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, script_id, fingerprint):
+        with self._lock:
+            plan = self._plans.get(script_id)
+            if plan is None or plan.fingerprint != fingerprint:
+                return None
+            self._plans.move_to_end(script_id)
+            return plan
+
+    def put(self, script_id, plan):
+        with self._lock:
+            self._plans[script_id] = plan
+            self._plans.move_to_end(script_id)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+    def pop(self, script_id):
+        with self._lock:
+            self._plans.pop(script_id, None)
+
+
+_cache = _PlanCache()
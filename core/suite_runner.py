@@ -0,0 +1,163 @@
+import argparse
+import multiprocessing
+import os
+import shlex
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.logger import log
+
+
+class VirtualDisplay:
+    """一个 Xvfb 虚拟显示，每个并行 worker 独占一个"""
+
+    def __init__(self, number, size=(1920, 1080), depth=24):
+        self.number = number
+        self.size = size
+        self.depth = depth
+        self.proc = None
+        self.app = None
+
+    @property
+    def name(self):
+        return f":{self.number}"
+
+    def start(self, timeout=10):
+        width, height = self.size
+        self.proc = subprocess.Popen(
+            ["Xvfb", self.name, "-screen", "0", f"{width}x{height}x{self.depth}", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        socket = f"/tmp/.X11-unix/X{self.number}"
+        deadline = time.time() + timeout
+        while not os.path.exists(socket):
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"Xvfb {self.name} 启动失败（显示号可能已被占用）")
+            if time.time() > deadline:
+                self.stop()
+                raise TimeoutError(f"Xvfb {self.name} 在 {timeout}s 内未就绪")
+            time.sleep(0.05)
+
+    def launch(self, command):
+        """在该显示上启动被测程序"""
+        self.app = subprocess.Popen(shlex.split(command), env=dict(os.environ, DISPLAY=self.name))
+
+    def stop(self):
+        for proc in (self.app, self.proc):
+            if proc and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        self.app = self.proc = None
+
+
+def _init_worker(displays):
+    # 每个 worker 进程启动时领取一个显示号；必须在导入 pyautogui 之前设置 DISPLAY
+    os.environ["DISPLAY"] = displays.get()
+
+
+def _run_script_worker(script_id, content, config):
+    from core.test_executor import TestExecutor
+    executor = TestExecutor(config)
+    report = executor.run_script(content, script_id, save_report=False)
+    report["display"] = os.environ.get("DISPLAY")
+    return report
+
+
+class SuiteRunner:
+    """在多个 Xvfb 虚拟显示上并行回放脚本：每个显示一个进程、一个 TestExecutor，报告由主进程串行写库"""
+
+    def __init__(self, config, workers=None, base_display=99, screen=(1920, 1080), app_command=None):
+        self.config = config
+        self.workers = workers or os.cpu_count() or 1
+        self.base_display = base_display
+        self.screen = screen
+        self.app_command = app_command  # 每个显示启动后要运行的被测程序命令
+
+    def run(self, scripts, on_report=None):
+        """scripts 为 [(script_id, content)]；返回汇总字典"""
+        from core.report_manager import ReportManager
+        summary = {"total": len(scripts), "passed": 0, "failed": 0, "errors": 0, "script_time": 0.0}
+        if not scripts:
+            log("[并行回放] 没有需要执行的脚本")
+            return dict(summary, wall_time=0, speedup=0)
+        reports = ReportManager()
+        workers = max(1, min(self.workers, len(scripts)))
+        displays = [VirtualDisplay(self.base_display + i, self.screen) for i in range(workers)]
+        # 每个 worker 的 OCR 进程池只分到 CPU 核数的一份，否则 N 个 worker 各开 N 个 Tesseract 进程
+        ocr_share = max(1, (os.cpu_count() or 1) // workers)
+        worker_config = dict(self.config, ocr_workers=ocr_share)
+        wall_start = time.time()
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            queue = ctx.Queue()
+            for display in displays:
+                display.start()
+                if self.app_command:
+                    display.launch(self.app_command)
+                queue.put(display.name)
+            log(f"[并行回放] 已启动 {workers} 个虚拟显示，共 {len(scripts)} 个脚本，每个 worker 的 OCR 进程数 {ocr_share}")
+
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_init_worker, initargs=(queue,)) as pool:
+                futures = {pool.submit(_run_script_worker, sid, content, worker_config): sid
+                           for sid, content in scripts}
+                for future in as_completed(futures):
+                    sid = futures[future]
+                    try:
+                        report = future.result()
+                    except Exception as e:
+                        summary["errors"] += 1
+                        log(f"[并行回放] 脚本 {sid} 执行异常：{e}")
+                        report = {"script_id": sid, "summary": f"执行异常：{e}", "success_rate": 0,
+                                  "duration": 0, "detail": str(e), "replay_mode": None}
+                    else:
+                        key = "passed" if report["success_rate"] >= 1 else "failed"
+                        summary[key] += 1
+                        summary["script_time"] += report["duration"]
+                        log(f"[并行回放] 脚本 {sid} 完成（{report['display']}）：{report['summary']}，"
+                            f"用时 {report['duration']}s")
+                    report["report_id"] = reports.save(report)  # 只有主进程写 SQLite，避免锁竞争
+                    if on_report:
+                        on_report(report)
+        finally:
+            for display in displays:
+                display.stop()
+
+        summary["wall_time"] = round(time.time() - wall_start, 2)
+        summary["script_time"] = round(summary["script_time"], 2)
+        summary["speedup"] = round(summary["script_time"] / summary["wall_time"], 2) if summary["wall_time"] else 0
+        log(f"[并行回放] 完成：通过 {summary['passed']}，失败 {summary['failed']}，异常 {summary['errors']}；"
+            f"墙钟 {summary['wall_time']}s，脚本累计 {summary['script_time']}s，加速比 {summary['speedup']}x")
+        return summary
+
+
+def main():
+    from core.config_manager import ConfigManager
+    from core.script_manager import ScriptManager
+    parser = argparse.ArgumentParser(description="在多个 Xvfb 虚拟显示上并行回放 scripts 表中的脚本")
+    parser.add_argument("ids", nargs="*", type=int, help="脚本 id，留空则按 --tag 选择或运行全部")
+    parser.add_argument("--tag", action="append", default=[], help="按标签选择脚本，可重复")
+    parser.add_argument("--workers", type=int, default=None, help="并发数（虚拟显示数），默认 CPU 核数")
+    parser.add_argument("--display", type=int, default=99, help="起始显示号")
+    parser.add_argument("--screen", default="1920x1080", help="虚拟显示分辨率")
+    parser.add_argument("--app", default=None, help="每个显示上启动的被测程序命令")
+    args = parser.parse_args()
+
+    manager = ScriptManager()
+    if args.ids:
+        ids = args.ids
+    elif args.tag:
+        ids = [s["id"] for s in manager.list_by_tags(args.tag)]
+    else:
+        ids = [s["id"] for s in manager.list_scripts()]
+    scripts = [(sid, manager.load_by_id(sid)["content"]) for sid in ids]
+    width, height = (int(v) for v in args.screen.lower().split("x"))
+    runner = SuiteRunner(ConfigManager().load_all(), args.workers, args.display, (width, height), args.app)
+    summary = runner.run(scripts)
+    raise SystemExit(0 if summary["failed"] == 0 and summary["errors"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PHASES = ("capture", "locate", "inject", "sleep")
+PHASE_NAMES = {"capture": "截屏", "locate": "定位", "inject": "注入", "sleep": "等待", "total": "合计"}
+
+
+class StepTimer:
+    """单个步骤的分阶段计时；阶段可以嵌套，内层阶段的时间不重复计入外层（例如定位中的截屏只算截屏）"""
+
+    def __init__(self, index, action):
+        self.index = index
+        self.action = action or "invalid"  # 格式错误、缺少 action 的步骤
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.attempts = []  # 每次定位尝试（一次匹配或 OCR）的耗时
+        self.success = False
+        self.total = 0.0
+        self.thread = threading.get_ident()  # 只记录执行线程上的耗时，后台预取的工作不计入
+        self._stack = []  # [阶段名, 本段开始时间]
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.phases[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            name, start = self._stack.pop()
+            self.phases[name] += now - start
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def finish(self, success):
+        self.success = success
+        self.total = time.perf_counter() - self._start
+
+    def as_row(self):
+        row = {"step_index": self.index, "action": self.action, "total": round(self.total, 6),
+               "attempts": json.dumps([round(a, 6) for a in self.attempts]), "success": int(self.success)}
+        row.update({name: round(self.phases[name], 6) for name in PHASES})
+        return row
+
+
+class StepTelemetry:
+    """回放过程的分步计时：执行器在每步开始/结束时调用 begin/end，各处用 phase() 标记耗时阶段"""
+
+    def __init__(self):
+        self.steps = []
+        self.current = None
+
+    def reset(self):
+        self.steps = []
+        self.current = None
+
+    def begin(self, step):
+        self.current = StepTimer(step.index, step.action)
+        return self.current
+
+    def end(self, success):
+        if self.current:
+            self.current.finish(success)
+            self.steps.append(self.current)
+            self.current = None
+
+    def phase(self, name):
+        timer = self.current
+        if timer is None or timer.thread != threading.get_ident():
+            return nullcontext()
+        return timer.phase(name)
+
+    def attempt(self, seconds):
+        timer = self.current
+        if timer is not None and timer.thread == threading.get_ident():
+            timer.attempts.append(seconds)
+
+    def totals(self):
+        """各阶段累计耗时（秒）"""
+        return {name: sum(t.phases[name] for t in self.steps) for name in PHASES}
+
+    def rows(self):
+        return [t.as_row() for t in self.steps]
+
+    def wrap_backend(self, backend):
+        return TimedBackend(backend, self)
+
+
+class TimedBackend:
+    """给截图后端的 grab 计入 capture 阶段，其余属性原样转发"""
+
+    def __init__(self, backend, telemetry):
+        self.backend = backend
+        self.telemetry = telemetry
+
+    def grab(self, region=None):
+        with self.telemetry.phase("capture"):
+            return self.backend.grab(region)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def percentile(values, q):
+    """线性插值百分位数，q 取 0~100"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(rows):
+    """按动作类型汇总各阶段耗时的 p50/p95，返回 {action: {"count": n, 阶段: (p50, p95)}}"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row["action"] or "invalid", []).append(row)  # 旧报告中可能有 action 为空的行
+    stats = {}
+    for action, items in sorted(groups.items(), key=lambda kv: str(kv[0])):
+        entry = {"count": len(items)}
+        for name in PHASES + ("total",):
+            values = [item[name] or 0.0 for item in items]
+            entry[name] = (percentile(values, 50), percentile(values, 95))
+        stats[action] = entry
+    return stats
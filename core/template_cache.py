@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+import cv2
+from core.capture import load_image
+
+
+class TemplateCache:
+    """已解码模板图像缓存：按 (路径, mtime) 命中，超出内存预算时按 LRU 淘汰"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 绝对路径 -> (mtime, color, gray)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def get_instance(cls, max_bytes=None):
+        """进程内共享的缓存实例，max_bytes 仅在首次创建时生效"""
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = TemplateCache(max_bytes) if max_bytes else TemplateCache()
+        return cls._instance
+
+    def get(self, path):
+        """返回模板的 (color, gray) 数组，color 为 OpenCV 的 BGR 顺序；文件被修改后自动重新解码"""
+        key = os.path.abspath(path)
+        mtime = os.path.getmtime(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        # 解码放在锁外，避免大图阻塞其它线程的命中查询
+        color = load_image(key)
+        gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[1].nbytes + old[2].nbytes
+            self._entries[key] = (mtime, color, gray)
+            self._bytes += color.nbytes + gray.nbytes
+            self._evict()
+        return color, gray
+
+    def _evict(self):
+        # 至少保留刚放入的一项，即使单张模板就超出预算
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, color, gray) = self._entries.popitem(last=False)
+            self._bytes -= color.nbytes + gray.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """命中/未命中/淘汰计数与当前内存占用"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -1,13 +1,73 @@
 import pyautogui
 import time
 import threading
-from pynput import keyboard
-from core.db import Database
+from concurrent.futures import ThreadPoolExecutor
+from core.report_manager import ReportManager
+from core.template_cache import TemplateCache
+from core.image_store import ImageStore
+from core.matcher import FramePyramid, TemplateMatcher
+from core.frame_diff import frame_signature, thumbnail, change_ratio
+from core.ocr import OcrIndex
+from core.capture import create_backend, to_gray
+from core.artifacts import ArtifactWriter
+from core.step_plan import compile_script
+from core.run_control import RunControl, RunStopped, HotkeyService
+from core.telemetry import StepTelemetry, PHASE_NAMES
 from utils.logger import log
-import pytesseract
-from PIL import Image
 import os
 
+class FrameCache:
+    """屏幕帧缓存：同一步骤内的图像/OCR/断言定位共享一次截屏"""
+
+    def __init__(self, backend, max_age=0.5):
+        self.backend = backend  # 截图后端，见 core.capture
+        self.max_age = max_age  # 新鲜度窗口（秒），超过则重新截屏
+        self._frame = None
+        self._pyramid = None
+        self._captured_at = 0.0
+        self._lock = threading.Lock()
+        self.captures = 0  # 实际截屏次数
+        self.reuses = 0  # 复用缓存帧次数
+
+    def get(self):
+        """返回新鲜度窗口内的屏幕帧，过期或无缓存时重新截屏"""
+        with self._lock:
+            if self._frame is None or time.time() - self._captured_at > self.max_age:
+                self._frame = self.backend.grab()
+                self._pyramid = None
+                self._captured_at = time.time()
+                self.captures += 1
+            else:
+                self.reuses += 1
+            return self._frame
+
+    def pyramid(self):
+        """当前帧的灰度金字塔，同一帧只转换一次"""
+        frame = self.get()
+        with self._lock:
+            if self._frame is not frame:  # 期间帧已被替换，不写入缓存
+                return FramePyramid(to_gray(frame))
+            if self._pyramid is None:
+                self._pyramid = FramePyramid(to_gray(frame))
+            return self._pyramid
+
+    def signature(self):
+        """当前帧 1/4 缩小层的内容摘要，画面不变时摘要不变"""
+        return frame_signature(self.pyramid().level(2))
+
+    def age(self):
+        """当前缓存帧的年龄（秒），无缓存帧时返回 None"""
+        if self._frame is None:
+            return None
+        return time.time() - self._captured_at
+
+    def invalidate(self):
+        """丢弃缓存帧，下次 get 时重新截屏（重试或注入输入后调用）"""
+        with self._lock:
+            self._frame = None
+            self._pyramid = None
+
+
 class TestExecutor:
     def __init__(self, config):
         self.click_interval = config.get("click_interval", 0.1)
@@ -16,32 +76,249 @@ class TestExecutor:
         self.image_retry_count = config.get("image_retry_count", 3)
         self.image_confidence = config.get("image_confidence", 0.8)
         self.enable_fallback = config.get("enable_fallback", True)
-        self.paused_event = threading.Event()
-        self.paused_event.set()  # 默认不暂停
-        self.stopped_event = threading.Event()
+        self.telemetry = StepTelemetry()  # 分步计时：截屏/定位/注入/等待
+        self.capture = self.telemetry.wrap_backend(create_backend(config))
+        self.frame_cache = FrameCache(self.capture, config.get("frame_max_age", 0.5))
+        self.image_store = ImageStore.get_instance()
+        self.template_cache = TemplateCache.get_instance(config.get("template_cache_mb", 64) * 1024 * 1024)
+        self.roi_search = config.get("roi_search", True)  # 先在录制坐标附近搜索
+        self.roi_padding = config.get("roi_padding", 40)
+        self.roi_scales = config.get("roi_scales", [1, 2, 4])
+        self.matcher = TemplateMatcher(self.image_confidence, max_level=config.get("match_max_level", 2))
+        self.lookahead_steps = config.get("lookahead_steps", 5)  # 批量预匹配后续几步的图像定位
+        self.verify_margin = config.get("verify_margin", 8)
+        # 回放速度：realtime 按录制间隔；scaled 按 replay_speed 倍速；turbo 不等待；ready 以画面就绪代替录制间隔
+        self.replay_mode = config.get("replay_mode", "realtime")
+        self.replay_speed = config.get("replay_speed", 1.0)
+        self.ready_stable_for = config.get("ready_stable_for", 0.1)
+        # 失败截图交给后台线程编码写盘，回放线程不等待磁盘 I/O
+        self.artifacts = ArtifactWriter(max_bytes=config.get("artifact_queue_mb", 64) * 1024 * 1024)
+        self._run_id = None
+        self.ocr_index = OcrIndex(config.get("ocr_tile_size", 256), workers=config.get("ocr_workers", 0))
+        self.wait_mode = config.get("wait_mode", "adaptive")  # adaptive: 按 timeout 自适应轮询；retry: 固定次数重试
+        self.poll_interval = config.get("poll_interval", 0.05)  # 自适应轮询的起始间隔
+        self.poll_max_interval = config.get("poll_max_interval", 0.5)  # 自适应轮询的最大间隔
+        self._provisional = {}  # 步骤序号 -> 预匹配得到的临时坐标，未命中为 None
+        self._current_step = None
+        # 流水线模式：在等待录制间隔/操作间隔的同时，由后台线程截屏匹配下一步的图像定位
+        self.pipeline = config.get("pipeline", False)
+        self._pipeline_pool = None
+        self._plan = None
+        self._speculation = {}  # 步骤序号 -> 后台匹配的 Future
+        self._speculated = set()  # 临时坐标来自流水线预测的步骤
+        self.pipeline_stats = {"verified": 0, "discarded": 0, "missed": 0}
+        self.control = RunControl()  # 暂停/停止控制，所有等待都通过它进行以便随时打断
+        self._track_baseline = False  # 脚本含 wait_for_change 时，每次注入输入前记下画面
+        self._baseline = None  # 最近一次注入输入之前的画面
 
         self.is_playing = False  # 控制是否处于回放状态
         self.is_recording = False  # 控制是否处于录制状态
         self.script = []  # 用于存储当前回放的脚本
 
+    def _search_regions(self, fallback, template_size, frame_size):
+        """生成由近及远的搜索区域：录制坐标附近的窗口逐级放大，最后为全屏（None）"""
+        stages = []
+        if self.roi_search and fallback and len(fallback) == 2:
+            tw, th = template_size
+            fw, fh = frame_size
+            for scale in self.roi_scales:
+                half_w = (tw // 2 + self.roi_padding) * scale
+                half_h = (th // 2 + self.roi_padding) * scale
+                left = max(0, int(fallback[0] - half_w))
+                top = max(0, int(fallback[1] - half_h))
+                right = min(fw, int(fallback[0] + half_w))
+                bottom = min(fh, int(fallback[1] + half_h))
+                if right - left < tw or bottom - top < th:
+                    continue  # 窗口被屏幕边缘裁得比模板还小
+                if right - left >= fw and bottom - top >= fh:
+                    break  # 已覆盖全屏，直接进入全屏阶段
+                stages.append((f"ROI x{scale}", (left, top, right - left, bottom - top)))
+        stages.append(("全屏", None))
+        return stages
+
+    def _match_image(self, template, pyramid, fallback):
+        """按搜索区域逐级匹配，返回 (中心坐标, 阶段名)，未命中返回 (None, None)"""
+        th, tw = template.shape[:2]
+        fh, fw = pyramid.shape
+        for stage, region in self._search_regions(fallback, (tw, th), (fw, fh)):
+            hit = self.matcher.match(pyramid, template, region)
+            if hit:
+                return (hit[0], hit[1]), stage
+        return None, None
+
+    def _prefetch_locators(self, steps, start):
+        """一次截屏批量匹配接下来 N 步的图像定位，结果作为临时坐标，留待各步骤执行时复核"""
+        batch = []
+        for j in range(start, min(len(steps), start + self.lookahead_steps)):
+            locator = steps[j].locator
+            if j in self._provisional or steps[j].error or not locator or locator.get("by") != "image":
+                continue
+            path = self.image_store.resolve(locator)
+            if not path or not os.path.exists(path):
+                continue
+            batch.append((j, self.template_cache.get(path)[1], locator.get("fallback")))
+        if len(batch) < 2:
+            return  # 只有当前一步时交给常规流程，不必批量
+
+        # 所有模板共享同一帧的金字塔，但每个模板仍按自己的录制坐标由近及远搜索：
+        # 画面上有多个相同控件（如一排同样的输入框）时，各步骤应命中各自附近的那一个
+        pyramid = self.frame_cache.pyramid()
+        found = 0
+        for j, template, fallback in batch:
+            pt, _ = self._match_image(template, pyramid, fallback)
+            self._provisional[j] = pt
+            found += 1 if pt else 0
+        log(f"[预匹配] 一次截屏匹配第 {batch[0][0] + 1}~{batch[-1][0] + 1} 步的 {len(batch)} 个模板，命中 {found} 个")
+
+    def _speculate(self, j):
+        """流水线模式：后台截屏匹配第 j 步的图像定位，结果作为临时坐标，由该步开始时复核或丢弃"""
+        plan = self._plan
+        if not self.pipeline or plan is None or j >= len(plan.steps):
+            return
+        if j in self._provisional or j in self._speculation:
+            return
+        step = plan.steps[j]
+        locator = step.locator
+        if step.error or not locator or locator.get("by") != "image":
+            return
+        path = self.image_store.resolve(locator)
+        if not path or not os.path.exists(path):
+            return
+        if self._pipeline_pool is None:
+            self._pipeline_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+        self._speculation[j] = self._pipeline_pool.submit(self._speculative_match, path, locator.get("fallback"))
+
+    def _speculative_match(self, path, fallback):
+        # 使用独立截屏，不写入帧缓存：复核时仍以该步开始时的画面为准
+        _, template = self.template_cache.get(path)
+        pyramid = FramePyramid(to_gray(self.capture.grab()))
+        pt, _ = self._match_image(template, pyramid, fallback)
+        return pt
+
+    def _collect_speculation(self, j):
+        """取回第 j 步的后台匹配结果（仍在进行时等待其完成），命中则作为临时坐标"""
+        future = self._speculation.pop(j, None)
+        if future is None:
+            return
+        try:
+            pt = future.result()
+        except Exception as e:
+            log(f"[流水线] 第 {j + 1} 步后台匹配失败：{e}")
+            return
+        if pt:
+            self._provisional[j] = pt
+            self._speculated.add(j)
+        else:
+            self.pipeline_stats["missed"] += 1
+
+    def _after_inject(self, wait):
+        """注入输入后进入 wait 秒的操作间隔前调用：流水线模式下趁等待开始匹配下一步"""
+        if wait > 0 and self._current_step is not None:
+            self._speculate(self._current_step + 1)
+
+    def _before_inject(self):
+        """注入输入前记下当时的画面，作为 wait_for_change 的比较基准；注入后缓存帧都会失效，
+        所以缓存中的帧一定是上一次注入之后的画面，通常可直接复用（例如图像定位刚用过的帧）"""
+        if self._track_baseline:
+            self._baseline = self.frame_cache.get()
+
+    def _verify_provisional(self, template, pt):
+        """在临时坐标周围的小窗口内复核模板是否仍在原处"""
+        th, tw = template.shape[:2]
+        m = self.verify_margin
+        region = (max(0, pt[0] - tw // 2 - m), max(0, pt[1] - th // 2 - m), tw + 2 * m, th + 2 * m)
+        hit = self._timed_attempt(self.matcher.match, self.frame_cache.pyramid(), template, region)
+        return (hit[0], hit[1]) if hit else None
+
+    def _retry_image(self, template, locator):
+        """固定次数重试匹配，每次失败间隔 0.3 秒"""
+        for attempt in range(self.image_retry_count):
+            if attempt:
+                self.frame_cache.invalidate()  # 重试必须基于新的屏幕帧
+            pyramid = self.frame_cache.pyramid()
+            pt, stage = self._timed_attempt(self._match_image, template, pyramid, locator.get("fallback"))
+            if pt:
+                log(f"[图像识别] 成功（第 {attempt + 1} 次，{stage}，帧龄 {self.frame_cache.age():.3f}s）")
+                return pt
+            log(f"[图像识别] 第 {attempt + 1} 次失败，重试中...")
+            self._sleep(0.3)
+        return None
+
+    def _wait_for_image(self, template, locator):
+        """在步骤截止时间内等待图像出现：轮询间隔先短后长，画面未变化时跳过重复匹配"""
+        timeout = locator.get("timeout", self.timeout)
+        start = time.time()
+        deadline = start + timeout
+        interval = self.poll_interval
+        last_signature = None
+        attempts = 0
+        while True:
+            if attempts:
+                self.frame_cache.invalidate()
+            pyramid = self.frame_cache.pyramid()
+            signature = self.frame_cache.signature()
+            if signature != last_signature:
+                attempts += 1
+                pt, stage = self._timed_attempt(self._match_image, template, pyramid, locator.get("fallback"))
+                if pt:
+                    log(f"[图像识别] 成功（第 {attempts} 次匹配，{stage}，等待 {time.time() - start:.2f}s）")
+                    return pt
+                last_signature = signature
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                log(f"[图像识别] 等待 {timeout}s 超时，共匹配 {attempts} 次")
+                return None
+            self._sleep(min(interval, remaining))
+            interval = min(interval * 1.5, self.poll_max_interval)
+
+    def _sleep(self, seconds):
+        """可被暂停/停止打断的等待，计入 sleep 阶段"""
+        with self.telemetry.phase("sleep"):
+            self.control.sleep(seconds)
+
+    def _timed_attempt(self, func, *args):
+        """执行一次定位尝试（匹配或 OCR）并记录其耗时"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.telemetry.attempt(time.perf_counter() - start)
+
     def _locate(self, locator):
+        with self.telemetry.phase("locate"):
+            return self._locate_point(locator)
+
+    def _locate_point(self, locator):
         if locator["by"] == "coords":
             pt = tuple(locator["value"])
 
         elif locator["by"] == "image":
-            image_path = locator["value"]
-            if not os.path.exists(image_path):
+            image_path = self.image_store.resolve(locator)  # 新脚本按摘要，旧脚本按路径
+            if not image_path or not os.path.exists(image_path):
                 raise FileNotFoundError(f"图像文件不存在：{image_path}")
 
+            _, template = self.template_cache.get(image_path)
             pt = None
-            for attempt in range(self.image_retry_count):
-                pt = pyautogui.locateCenterOnScreen(image_path, confidence=self.image_confidence)
+            provisional = self._provisional.pop(self._current_step, None) if self._current_step is not None else None
+            if provisional:
+                pt = self._verify_provisional(template, provisional)
                 if pt:
-                    log(f"[图像识别] 成功（第 {attempt + 1} 次）")
-                    break
+                    log(f"[图像识别] 预匹配坐标复核通过：{pt}")
                 else:
-                    log(f"[图像识别] 第 {attempt + 1} 次失败，重试中...")
-                    time.sleep(0.3)
+                    log("[图像识别] 预匹配坐标已失效，重新搜索")
+                if self._current_step in self._speculated:
+                    self._speculated.discard(self._current_step)
+                    self.pipeline_stats["verified" if pt else "discarded"] += 1
+            if pt is None:
+                if self.wait_mode == "adaptive":
+                    pt = self._wait_for_image(template, locator)
+                else:
+                    pt = self._retry_image(template, locator)
+            anchor = locator.get("anchor")
+            if pt is not None and anchor:
+                # 屏幕边缘录制的模板被截掉一部分，点击点不在模板中心：按匹配位置左上角加 anchor 计算
+                th, tw = template.shape[:2]
+                pt = (pt[0] - tw // 2 + anchor[0], pt[1] - th // 2 + anchor[1])
             if pt is None:
                 fallback = locator.get("fallback")
                 if self.enable_fallback and fallback and len(fallback) == 2:
@@ -53,15 +330,8 @@ class TestExecutor:
         elif locator["by"] == "text":
             if not self.ocr_enabled:
                 raise ValueError("未启用 OCR 功能")
-            screenshot = pyautogui.screenshot()
-            boxes = pytesseract.image_to_data(screenshot, output_type=pytesseract.Output.DICT)
-            for i in range(len(boxes["text"])):
-                if locator["value"] in boxes["text"][i]:
-                    x = boxes["left"][i] + boxes["width"][i] // 2
-                    y = boxes["top"][i] + boxes["height"][i] // 2
-                    pt = (x, y)
-                    break
-            else:
+            pt = self._timed_attempt(self.ocr_index.find, self.frame_cache.pyramid().level(0), locator["value"])
+            if pt is None:
                 raise ValueError(f"OCR 未找到文本：{locator['value']}")
         else:
             raise ValueError(f"不支持的定位方式: {locator['by']}")
@@ -77,8 +347,12 @@ class TestExecutor:
             raise RuntimeError("定位失败")
 
         # 区分按钮类型
-        pyautogui.click(x=pt[0], y=pt[1], button=button)
-        time.sleep(self.click_interval)
+        self._before_inject()
+        with self.telemetry.phase("inject"):
+            pyautogui.click(x=pt[0], y=pt[1], button=button)
+        self.frame_cache.invalidate()
+        self._after_inject(self.click_interval)
+        self._sleep(self.click_interval)
 
     def move(self, locator_or_position):
         if isinstance(locator_or_position, dict):
@@ -87,20 +361,34 @@ class TestExecutor:
             pt = tuple(locator_or_position)
 
         if pt:
-            pyautogui.moveTo(pt)
-            time.sleep(0.01)
+            # 跳过 pyautogui 每次调用后的默认 PAUSE，拖动轨迹的节奏由录制间隔控制
+            self._before_inject()
+            with self.telemetry.phase("inject"):
+                pyautogui.moveTo(pt, _pause=False)
+            self.frame_cache.invalidate()
+            self._sleep(0.01)
 
     def scroll(self, position, delta):
         """模拟滚动操作"""
         x, y = position
-        pyautogui.moveTo(x, y)
-        pyautogui.scroll(delta)
-        time.sleep(0.1)
+        self._before_inject()
+        with self.telemetry.phase("inject"):
+            pyautogui.moveTo(x, y)
+            pyautogui.scroll(delta)
+        self.frame_cache.invalidate()
+        self._after_inject(0.1)
+        self._sleep(0.1)
 
     def input_key(self, key):
         """模拟键盘输入"""
-        pyautogui.write(key)
-        time.sleep(self.click_interval)
+        self._before_inject()
+        self.control.mark_injected()
+        with self.telemetry.phase("inject"):
+            pyautogui.write(key)
+        self.control.mark_injected()  # 热键监听据此忽略回放自己打出的 P/S/ESC
+        self.frame_cache.invalidate()
+        self._after_inject(self.click_interval)
+        self._sleep(self.click_interval)
 
     def assert_exists(self, locator):
         """验证元素是否存在"""
@@ -108,139 +396,260 @@ class TestExecutor:
         if not pt:
             raise AssertionError("断言失败：目标元素未出现")
 
-    def screenshot_error(self, step, reason, index):
-        """当步骤执行失败时截图"""
-        os.makedirs("data/errors", exist_ok=True)
-        fname = f"data/errors/step_{index}_error.png"
-        pyautogui.screenshot(fname)
-        log(f"[ERROR] 步骤 {index} 执行失败: {reason}，截图已保存到 {fname}")
-
-    def run_script(self, script, script_id=None):
-        """执行回放脚本"""
-        log("🟢 开始执行脚本...")
-        self.is_playing = True
-        log_lines = []  # 用于存储每一步的执行日志
-        start_time = time.time()
-        last_time = None
-        total = len(script)
-        success = 0
+    def _thumbnail(self, frame, region=None):
+        if region:
+            left, top, width, height = region
+            frame = frame[top:top + height, left:left + width]
+        return thumbnail(to_gray(frame))
 
-        for i, step in enumerate(script):
-            if self.stopped_event.is_set():
-                log("回放已停止")
-                break
+    def wait_until_stable(self, step):
+        """等待画面（或 region 区域）连续 stable_for 秒不再变化，超时抛出 TimeoutError"""
+        region = step.get("region")
+        stable_for = step.get("stable_for", 0.5)
+        threshold = step.get("threshold", 0.0)  # 允许变化的块比例，例如有闪烁光标时可设为 0.01
+        timeout = step.get("timeout", self.timeout)
+        start = time.time()
+        prev = self._thumbnail(self.capture.grab(), region)
+        stable_since = start
+        while True:
+            self._sleep(self.poll_interval)
+            cur = self._thumbnail(self.capture.grab(), region)
+            now = time.time()
+            if change_ratio(prev, cur) > threshold:
+                stable_since = now
+            prev = cur
+            if now - stable_since >= stable_for:
+                self.frame_cache.invalidate()
+                log(f"[等待] 画面已稳定，用时 {now - start:.2f}s")
+                return now - start
+            if now - start >= timeout:
+                raise TimeoutError(f"画面在 {timeout}s 内未稳定")
 
-            while not self.paused_event.is_set():
-                time.sleep(0.1)
+    def wait_for_change(self, step):
+        """等待画面（或 region 区域）相对上一步操作前的画面发生变化，超时抛出 TimeoutError"""
+        region = step.get("region")
+        threshold = step.get("threshold", 0.0)
+        timeout = step.get("timeout", self.timeout)
+        start = time.time()
+        # 以上一次注入输入前记下的画面为基准，避免画面在本步开始前就已变化而等不到
+        baseline = self._baseline
+        base = self._thumbnail(baseline if baseline is not None else self.capture.grab(), region)
+        while True:
+            cur = self._thumbnail(self.capture.grab(), region)
+            now = time.time()
+            if change_ratio(base, cur) > threshold:
+                self.frame_cache.invalidate()
+                log(f"[等待] 画面已变化，用时 {now - start:.2f}s")
+                return now - start
+            if now - start >= timeout:
+                raise TimeoutError(f"画面在 {timeout}s 内没有变化")
+            self._sleep(self.poll_interval)
 
-            # 同步操作时间间隔
-            if last_time and "time" in step:
-                delay = step["time"] - last_time
-                time.sleep(delay)
+    def replay_mode_label(self):
+        if self.replay_mode == "scaled":
+            return f"scaled x{self.replay_speed}"
+        return self.replay_mode
 
-            last_time = step["time"]
+    def _will_pace(self, step):
+        """当前回放模式下，该步骤开始前是否会等待（睡眠或等画面稳定）"""
+        if not step.delay or self.replay_mode == "turbo":
+            return False
+        if self.replay_mode == "scaled":
+            return self.replay_speed > 0
+        if self.replay_mode == "ready":
+            # 图像/文本定位本身会等待目标出现；坐标类步骤等画面稳定，最长不超过录制间隔
+            locator = step.locator
+            if locator and locator.get("by") in ("image", "text"):
+                return False
+            # 拖动过程中画面本来就在变化，等待稳定没有意义
+            return step.action not in ("move", "mouseUp") and step.delay >= self.ready_stable_for
+        return True
 
-            # 更新实时执行状态
-            log(f"正在执行第 {i+1} 步，共 {total} 步")
-            try:
-                # 自动补 locator
-                if "locator" not in step:
-                    if "position" in step:
-                        step["locator"] = {"by": "coords", "value": step["position"]}
-                    elif "x" in step and "y" in step:
-                        step["locator"] = {"by": "coords", "value": [step["x"], step["y"]]}
-                    else:
-                        raise ValueError("无 locator 且无坐标信息，无法执行")
-
-                action = step["action"]
-                now = step.get("time")
-                if last_time and now:
-                    delay = now - last_time
-                    if 0 < delay < 5:
-                        time.sleep(delay)
-                last_time = now
-
-                # 处理拖动操作
-                if step["action"] == "drag":
-                    start_pos = step["start_position"]
-                    end_pos = step["end_position"]
-                    self.mouse_drag(start_pos, end_pos)  # 调用拖动操作
-                elif step["action"] == "click":
-                    button = step.get("button", "left")  # 默认左键
-                    self.click(step["locator"], button)
-                elif step["action"] == "move":
-                    self.move(step["locator"])
-                elif step["action"] == "scroll":
-                    self.scroll(step["locator"]["value"], step["delta"])
-                elif step["action"] == "keyboard":
-                    self.input_key(step["key"])
-                elif step["action"] == "assert":
-                    self.assert_exists(step["locator"])
-                elif action == "mouseDown":
-                    pos = step["position"]
-                    pyautogui.mouseDown(x=pos[0], y=pos[1], button=step.get("button", "left"))
-                elif action == "mouseUp":
-                    pos = step["position"]
-                    pyautogui.mouseUp(x=pos[0], y=pos[1], button=step.get("button", "left"))
-                else:
-                    raise ValueError(f"未知操作类型：{step['action']}")
+    def _pace(self, step):
+        """按回放模式处理步骤前的录制间隔"""
+        if not self._will_pace(step):
+            return
+        if self.replay_mode == "scaled":
+            self._sleep(step.delay / self.replay_speed)
+        elif self.replay_mode == "ready":
+            self._settle(step.delay)
+        else:
+            self._sleep(step.delay)
 
-                success += 1
-                log_line = f"[✓] 步骤 {i+1}/{total} 执行成功: {action}"
-                log_lines.append(log_line)
-                log(log_line)
-            except Exception as e:
-                log_line = f"[✗] 步骤 {i + 1}/{total} 执行失败: {e}"
-                log_lines.append(log_line)
-                log(log_line)
-                self.screenshot_error(step, str(e), i + 1)
-                continue
+    def _settle(self, max_wait):
+        """等待画面在 ready_stable_for 秒内不再变化，最多等待 max_wait 秒"""
+        start = time.time()
+        prev = self._thumbnail(self.capture.grab())
+        stable_since = start
+        while True:
+            self._sleep(self.poll_interval)
+            cur = self._thumbnail(self.capture.grab())
+            now = time.time()
+            if change_ratio(prev, cur) > 0:
+                stable_since = now
+            prev = cur
+            if now - stable_since >= self.ready_stable_for or now - start >= max_wait:
+                self.frame_cache.invalidate()
+                return
 
+    def screenshot_error(self, step, reason, index):
+        """当步骤执行失败时截图：沿用定位时的缓存帧（过期则重新截屏），交给后台写入"""
+        frame = self.frame_cache.get()
+        if self.artifacts.submit(self._run_id, index - 1, frame, reason):
+            log(f"[ERROR] 步骤 {index} 执行失败: {reason}，截图已加入保存队列")
+        else:
+            log(f"[ERROR] 步骤 {index} 执行失败: {reason}，截图队列已满，本次截图被丢弃")
+
+    def run_script(self, script, script_id=None, save_report=True):
+        """执行回放脚本，返回报告字典"""
+        log(f"🟢 开始执行脚本...（回放模式：{self.replay_mode_label()}）")
+        self.is_playing = True
+        log_lines = []  # 用于存储每一步的执行日志
+        start_time = time.time()
+        self.frame_cache.invalidate()
+        self._provisional.clear()
+        self._speculated.clear()
+        self._run_id = self.artifacts.new_run_id()
+        self.pipeline_stats = dict.fromkeys(self.pipeline_stats, 0)
+        plan = compile_script(script, script_id)
+        self._plan = plan
+        self._track_baseline = any(step.action == "wait_for_change" for step in plan.steps)
+        self._baseline = None
+        total = len(plan)
+        success = 0
+        self.control.reset()
+        self.telemetry.reset()
+        hotkeys = HotkeyService.get_instance()
+        hotkeys.attach(self.control)
+
+        try:
+            for step in plan.steps:
+                i = step.index
+                ok = 0
+                try:
+                    self.control.checkpoint()  # 暂停时在此阻塞，恢复或停止时立即唤醒
+                    self.telemetry.begin(step)
+                    if self._will_pace(step):
+                        self._speculate(i)  # 流水线模式：录制间隔内先行匹配本步；不等待时先行匹配只会多一次截屏
+                    # 同步操作时间间隔
+                    self._pace(step)
+                    ok = self._run_step(plan, step, log_lines)
+                    success += ok
+                except RunStopped:
+                    log_line = f"[■] 回放在第 {i + 1}/{total} 步被停止"
+                    log_lines.append(log_line)
+                    log(log_line)
+                    break
+                finally:
+                    self.telemetry.end(bool(ok))
+        finally:
+            hotkeys.detach(self.control)
+            self.is_playing = False
+            for future in self._speculation.values():
+                future.cancel()
+            self._speculation.clear()
+            self._plan = None
+
+        self._current_step = None
         duration = round(time.time() - start_time, 2)
+        artifacts = self.artifacts.finish_run(self._run_id)
+        if artifacts:
+            count = {status: sum(1 for a in artifacts if a["status"] == status) for status in ("duplicate", "dropped")}
+            log(f"[失败截图] 共 {len(artifacts)} 张，其中与已有截图相同 {count['duplicate']} 张、因队列已满丢弃 "
+                f"{count['dropped']} 张，目录：{os.path.join(self.artifacts.root, self._run_id)}")
+            for a in artifacts:
+                log_lines.append(f"    步骤 {a['step_index'] + 1} 失败截图：{a['path'] or '未保存（' + a['status'] + '）'}")
+        log(f"[帧缓存] 累计截屏 {self.frame_cache.captures} 次，复用 {self.frame_cache.reuses} 次")
+        stats = self.template_cache.stats()
+        log(f"[OCR 缓存] 命中 {self.ocr_index.hits} 次，整屏识别 {self.ocr_index.full_runs} 次，"
+            f"增量识别区域 {self.ocr_index.tile_runs} 个，提前命中 {self.ocr_index.short_circuits} 次")
+        log(f"[模板缓存] 命中 {stats['hits']} 次，未命中 {stats['misses']} 次，淘汰 {stats['evictions']} 次，"
+            f"占用 {stats['bytes'] / 1024 / 1024:.1f}MB")
+        if self.pipeline:
+            ps = self.pipeline_stats
+            log(f"[流水线] 预测坐标复核通过 {ps['verified']} 次，失效丢弃 {ps['discarded']} 次，后台未命中 {ps['missed']} 次")
+        totals = self.telemetry.totals()
+        log("[耗时] " + "，".join(f"{PHASE_NAMES[name]} {seconds:.2f}s" for name, seconds in totals.items()))
         rate = round(success / total * 100, 2) if total else 0
         log(f"✅ 执行完成：成功 {success} / 共 {total} 步，成功率 {rate}%，用时 {duration}s")
 
-        # 保存报告到数据库
-        db = Database.get_instance()
-        report_detail = "\n".join(log_lines)
-        db.execute("""
-                   INSERT INTO reports(script_id, summary, success_rate, duration, detail)
-                   VALUES (?, ?, ?, ?, ?)
-                   """, (script_id, f"成功率 {rate}%", rate / 100, duration, report_detail))
-        log("测试报告已生成并保存到数据库")
+        report = {
+            "script_id": script_id,
+            "summary": f"成功率 {rate}%",
+            "success_rate": rate / 100,
+            "duration": duration,
+            "detail": "\n".join(log_lines),
+            "replay_mode": self.replay_mode_label(),
+            "total": total,
+            "success": success,
+            "timings": self.telemetry.rows(),  # 分步计时，随报告写入 step_timings 表
+            "artifacts": artifacts,  # 失败截图记录，随报告写入 report_artifacts 表
+        }
+        # 保存报告到数据库；并行执行时由主进程统一写库，子进程不保存
+        if save_report:
+            report["report_id"] = ReportManager().save(report)
+            log("测试报告已生成并保存到数据库")
+        return report
+
+    def _run_step(self, plan, step, log_lines):
+        """执行单个步骤，成功返回 1，失败截图并返回 0；停止信号原样抛出"""
+        i, total = step.index, len(plan)
+        # 更新实时执行状态
+        log(f"正在执行第 {i+1} 步，共 {total} 步")
+        self._current_step = i
+        self._collect_speculation(i)
+        locator = step.locator
+        if self.lookahead_steps > 1 and i not in self._provisional and locator and locator.get("by") == "image":
+            try:
+                self._prefetch_locators(plan.steps, i)
+            except Exception as e:
+                log(f"[预匹配] 失败，回退为逐步匹配：{e}")
+        try:
+            step.handler(self, step)
+        except RunStopped:
+            raise
+        except Exception as e:
+            log_line = f"[✗] 步骤 {i + 1}/{total} 执行失败: {e}"
+            log_lines.append(log_line)
+            log(log_line)
+            self.screenshot_error(step.raw, str(e), i + 1)
+            return 0
+        log_line = f"[✓] 步骤 {i+1}/{total} 执行成功: {step.action}"
+        log_lines.append(log_line)
+        log(log_line)
+        return 1
 
     def pause(self):
         """暂停回放"""
-        log("暂停回放")
-        self.paused_event.clear()  # 清除暂停标志
+        self.control.pause()
 
     def resume(self):
         """恢复回放"""
-        log("恢复回放")
-        self.paused_event.set()  # 设置为恢复状态
+        self.control.resume()
 
     def stop(self):
-        """停止回放"""
-        log("停止回放")
-        self.stopped_event.set()  # 设置停止标志
+        """停止回放（正在进行的等待和重试会立即中断）"""
+        self.control.stop()
 
-    def on_key_press(self, key):
-        """监听按键事件"""
-        try:
-            if key == keyboard.Key.esc:  # 按 ESC 键停止回放
-                self.stop()
-            elif key.char == 'p':  # 按 P 键暂停或恢复回放
-                if self.paused_event.is_set():
-                    self.pause()
-                else:
-                    self.resume()
-            elif key.char == 's':  # 按 S 键停止回放
-                self.stop()
-        except AttributeError:
-            pass  # 忽略非字符键
+    def mouse_down(self, position, button="left"):
+        """在指定位置按下鼠标"""
+        self._before_inject()
+        with self.telemetry.phase("inject"):
+            pyautogui.mouseDown(x=position[0], y=position[1], button=button)
+        self.frame_cache.invalidate()
+
+    def mouse_up(self, position, button="left"):
+        """在指定位置松开鼠标"""
+        self._before_inject()
+        with self.telemetry.phase("inject"):
+            pyautogui.mouseUp(x=position[0], y=position[1], button=button)
+        self.frame_cache.invalidate()
 
     def mouse_drag(self, start, end):
         """模拟鼠标拖动"""
-        pyautogui.mouseDown(x=start[0], y=start[1])  # 鼠标按下
-        pyautogui.moveTo(end[0], end[1], duration=0.5)  # 拖动到目标位置
-        pyautogui.mouseUp()  # 鼠标松开
+        self._before_inject()
+        with self.telemetry.phase("inject"):
+            pyautogui.mouseDown(x=start[0], y=start[1])  # 鼠标按下
+            pyautogui.moveTo(end[0], end[1], duration=0.5)  # 拖动到目标位置
+            pyautogui.mouseUp()  # 鼠标松开
+        self.frame_cache.invalidate()
@@ -1,6 +1,8 @@
 # main.py
+from utils.startup_timer import startup_timer
 import sys
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from ui.login_window import LoginWindow
 from ui.main_window import MainWindow
 from utils.session import load_login
@@ -17,14 +19,20 @@ def ensure_admin():
 
 if __name__ == "__main__":
     log("启动 GUI 自动化测试工具...")
-    ensure_admin()
+    startup_timer.mark("导入模块")
 
     app = QApplication(sys.argv)
+    startup_timer.mark("创建 QApplication")
     # 读取记住的登录信息
     session = load_login()
     if session:
         window = MainWindow(session["username"], session["role"])
     else:
         window = LoginWindow()
+    startup_timer.mark("构建窗口")
     window.show()
+    startup_timer.mark("显示窗口")
+    QTimer.singleShot(0, startup_timer.report)
+    # 默认管理员检查不影响首屏，放到事件循环开始后执行
+    QTimer.singleShot(0, ensure_admin)
     sys.exit(app.exec_())
@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QCheckBox,
-    QSlider, QPushButton, QHBoxLayout, QMessageBox,QSpinBox
+    QSlider, QPushButton, QHBoxLayout, QMessageBox,QSpinBox,
+    QComboBox, QDoubleSpinBox
 )
 from PyQt5.QtCore import Qt
 import json
@@ -40,6 +41,21 @@ class ConfigPage(QWidget):
         self.image_size_spin.setRange(50, 500)
         self.image_size_spin.setValue(self.config.get("image_region_size", 100))
         layout.addWidget(self.image_size_spin)
+        # 回放速度模式
+        layout.addWidget(QLabel("回放模式（realtime 原速 / scaled 倍速 / turbo 不等待 / ready 等画面就绪）"))
+        self.replay_mode_combo = QComboBox()
+        self.replay_mode_combo.addItems(["realtime", "scaled", "turbo", "ready"])
+        self.replay_mode_combo.setCurrentText(self.config.get("replay_mode", "realtime"))
+        layout.addWidget(self.replay_mode_combo)
+        layout.addWidget(QLabel("倍速（仅 scaled 模式）"))
+        self.replay_speed_spin = QDoubleSpinBox()
+        self.replay_speed_spin.setRange(0.1, 20.0)
+        self.replay_speed_spin.setSingleStep(0.5)
+        self.replay_speed_spin.setValue(self.config.get("replay_speed", 1.0))
+        layout.addWidget(self.replay_speed_spin)
+        self.pipeline_checkbox = QCheckBox("流水线回放：等待间隔时提前匹配下一步的图像")
+        self.pipeline_checkbox.setChecked(self.config.get("pipeline", False))
+        layout.addWidget(self.pipeline_checkbox)
         # 滑动时更新显示
         self.confidence_slider.valueChanged.connect(
             lambda val: self.confidence_value_label.setText(f"{val}%")
@@ -66,6 +82,9 @@ class ConfigPage(QWidget):
             self.config["enable_fallback"] = self.fallback_checkbox.isChecked()
             self.config["image_confidence"] = self.confidence_slider.value() / 100.0
             self.config["image_region_size"] = self.image_size_spin.value()
+            self.config["replay_mode"] = self.replay_mode_combo.currentText()
+            self.config["replay_speed"] = self.replay_speed_spin.value()
+            self.config["pipeline"] = self.pipeline_checkbox.isChecked()
 
             with open(CONFIG_FILE, "w", encoding="utf-8") as f:
                 json.dump(self.config, f, indent=4, ensure_ascii=False)
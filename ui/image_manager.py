@@ -6,6 +6,7 @@ from PyQt5.QtGui import QPixmap, QIcon
 from PyQt5.QtCore import QSize
 from PyQt5.QtCore import Qt
 from core.db import Database
+from core.image_store import ImageStore
 from PyQt5.QtWidgets import QMenu, QAction
 import os
 from utils.logger import log
@@ -30,11 +31,14 @@ class ImageManager(QWidget):
         self.delete_btn = QPushButton("删除所选图像")
         self.cleanup_btn = QPushButton("一键删除未引用图像")
         self.cleanup_btn.clicked.connect(self.delete_unused_images)
+        self.dedup_btn = QPushButton("合并重复图像")
+        self.dedup_btn.clicked.connect(self.merge_duplicate_images)
 
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.refresh_btn)
         btn_layout.addWidget(self.delete_btn)
         btn_layout.addWidget(self.cleanup_btn)
+        btn_layout.addWidget(self.dedup_btn)
 
 
         layout = QVBoxLayout()
@@ -185,4 +189,24 @@ class ImageManager(QWidget):
         self.load_images()
         QMessageBox.information(self, "清理完成", f"已删除未使用图像 {count} 个。")
 
-
+    def merge_duplicate_images(self):
+        """把旧的按时间命名的图像迁移到按内容寻址的图像库，相同截图合并为一个文件并改写脚本引用"""
+        store = ImageStore.get_instance()
+        preview = store.migrate(self.image_dir, dry_run=True)
+        if not preview["files"]:
+            QMessageBox.information(self, "无需合并", "没有需要迁移的旧图像文件。")
+            return
+        reply = QMessageBox.question(
+            self,
+            "确认合并",
+            f"共 {preview['files']} 个旧图像，其中重复 {preview['duplicates']} 个；"
+            f"将改写 {preview['scripts']} 个脚本中的 {preview['steps']} 处引用。\n是否继续？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        stats = store.migrate(self.image_dir)
+        self.load_images()
+        QMessageBox.information(self, "合并完成",
+                                f"保留 {stats['unique']} 个图像，合并重复 {stats['duplicates']} 个，"
+                                f"改写脚本 {stats['scripts']} 个。")
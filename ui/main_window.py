@@ -1,17 +1,11 @@
-from PyQt5.QtWidgets import QWidget, QPushButton, QVBoxLayout, QLabel, QTabWidget
-from core.recorder import Recorder
+from PyQt5.QtWidgets import QWidget, QPushButton, QVBoxLayout, QLabel, QTabWidget, QMessageBox
+from PyQt5.QtCore import QTimer
 from core.script_manager import ScriptManager
 from core.config_manager import ConfigManager
-from core.test_executor import TestExecutor
-from ui.script_editor import ScriptEditor
-from ui.report_viewer import ReportViewer
-from ui.user_admin import UserAdminPage
-from ui.config_page import ConfigPage
 from utils.logger import log
 from utils.session import clear_login
-from ui.script_history import ScriptHistory
-from ui.image_manager import ImageManager
 import threading
+import time
 
 class MainWindow(QWidget):
     def __init__(self, username, role):
@@ -20,15 +14,16 @@ class MainWindow(QWidget):
         self.resize(800, 600)
 
 
-        # 核心组件
-        cfg           = ConfigManager().load_all()
-        self.recorder = Recorder(cfg)
+        # 核心组件：录制器和执行器在第一次使用时才创建（会加载截图、图像匹配等重量级模块）
+        self.cfg      = ConfigManager().load_all()
         self.manager  = ScriptManager()
-        self.executor = TestExecutor(cfg)
-        self.image_manager = ImageManager()
+        self._recorder = None
+        self._executor = None
 
-        # UI Tabs
+        # UI Tabs：除首页外，各页面在第一次切换到时才构建
         tabs = QTabWidget()
+        self.tabs = tabs
+        self._lazy_tabs = {}  # 占位页 -> (属性名, 构建函数)
         # 录制/回放
         self.record_btn = QPushButton("开始录制")
         self.is_recording = False
@@ -40,26 +35,19 @@ class MainWindow(QWidget):
         rec_tab.setLayout(rec_layout)
         tabs.addTab(rec_tab, "录制/回放")
         # 脚本编辑
-        self.script_editor = ScriptEditor(self.manager)
-        tabs.addTab(self.script_editor, "脚本编辑")
+        self._add_lazy_tab("script_editor", "脚本编辑", self._build_script_editor)
         # 历史脚本
-        self.script_history = ScriptHistory(main_window=self)  # 传 self
-        tabs.addTab(self.script_history, "历史脚本")
+        self._add_lazy_tab("script_history", "历史脚本", self._build_script_history)
         # 报告查看
-        self.report_viewer = ReportViewer(main_window=self)  # 传 self
-        tabs.addTab(self.report_viewer, "报告查看")
-
+        self._add_lazy_tab("report_viewer", "报告查看", self._build_report_viewer)
         # 图像管理
-        self.image_manager = ImageManager()
-        tabs.addTab(self.image_manager, "图像管理")
+        self._add_lazy_tab("image_manager", "图像管理", self._build_image_manager)
         # 用户管理（仅管理员可见）
         if role == "admin":
-            tabs.addTab(UserAdminPage(), "用户管理")
-
-
+            self._add_lazy_tab("user_admin", "用户管理", self._build_user_admin)
         # 系统配置
-        tabs.addTab(ConfigPage(), "系统配置")
-        self.tabs = tabs
+        self._add_lazy_tab("config_page", "系统配置", self._build_config_page)
+        tabs.currentChanged.connect(self._on_tab_changed)
 
         layout = QVBoxLayout()
         layout.addWidget(tabs)
@@ -69,13 +57,88 @@ class MainWindow(QWidget):
         # 信号绑定
         self.record_btn.clicked.connect(self.toggle_record)
         self.play_btn.clicked.connect(self.start_play)
+        # 上次录制异常退出时残留的日志，窗口显示后提示恢复
+        QTimer.singleShot(0, self.check_unfinished_recordings)
         # 按钮绑定
         self.logout_btn.clicked.connect(self.logout)
 
+    @property
+    def recorder(self):
+        if self._recorder is None:
+            from core.recorder import Recorder
+            self._recorder = Recorder(self.cfg)
+        return self._recorder
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            from core.test_executor import TestExecutor
+            self._executor = TestExecutor(self.cfg)
+        return self._executor
+
+    def _add_lazy_tab(self, attr, title, factory):
+        """添加占位页，真正的页面在第一次显示时由 factory 构建"""
+        holder = QWidget()
+        holder_layout = QVBoxLayout()
+        holder_layout.setContentsMargins(0, 0, 0, 0)
+        holder.setLayout(holder_layout)
+        self.tabs.addTab(holder, title)
+        self._lazy_tabs[holder] = (attr, factory)
+        setattr(self, attr, None)
+        return holder
+
+    def _on_tab_changed(self, index):
+        self._ensure_tab(self.tabs.widget(index))
+
+    def _ensure_tab(self, holder):
+        entry = self._lazy_tabs.pop(holder, None)
+        if entry is None:
+            return
+        attr, factory = entry
+        start = time.perf_counter()
+        page = factory()
+        holder.layout().addWidget(page)
+        setattr(self, attr, page)
+        log(f"[启动耗时] 页面 {self.tabs.tabText(self.tabs.indexOf(holder))} 构建 {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def _show_tab(self, attr):
+        """切换到指定页面（必要时先构建），返回页面对象"""
+        for holder, (name, _) in list(self._lazy_tabs.items()):
+            if name == attr:
+                self._ensure_tab(holder)
+        page = getattr(self, attr)
+        self.tabs.setCurrentWidget(page.parentWidget())
+        return page
+
+    def _build_script_editor(self):
+        from ui.script_editor import ScriptEditor
+        return ScriptEditor(self.manager)
+
+    def _build_script_history(self):
+        from ui.script_history import ScriptHistory
+        return ScriptHistory(main_window=self)  # 传 self
+
+    def _build_report_viewer(self):
+        from ui.report_viewer import ReportViewer
+        return ReportViewer(main_window=self)  # 传 self
+
+    def _build_image_manager(self):
+        from ui.image_manager import ImageManager
+        return ImageManager()
+
+    def _build_user_admin(self):
+        from ui.user_admin import UserAdminPage
+        return UserAdminPage()
+
+    def _build_config_page(self):
+        from ui.config_page import ConfigPage
+        return ConfigPage()
+
     def open_script_by_id(self, script_id):
         """在脚本编辑器中打开某个脚本"""
-        self.script_editor.load_by_id(script_id)
-        self.script_editor.setFocus()
+        editor = self._show_tab("script_editor")
+        editor.load_by_id(script_id)
+        editor.setFocus()
 
     def toggle_record(self):
         if not self.is_recording:
@@ -85,10 +148,32 @@ class MainWindow(QWidget):
         else:
             script = self.recorder.stop()
             self.manager.save(script)
+            self.recorder.discard_journal()  # 已保存到数据库，录制日志不再需要
             log(f"脚本保存，共 {len(script)} 步")
             self.record_btn.setText("开始录制")
         self.is_recording = not self.is_recording
 
+    def check_unfinished_recordings(self):
+        """检查未保存的录制日志（录制中崩溃或保存前退出），询问是否恢复为脚本"""
+        from core.journal import pending_journals, recover
+        paths = pending_journals()
+        if not paths:
+            return
+        reply = QMessageBox.question(
+            self,
+            "恢复录制",
+            f"发现 {len(paths)} 个未保存的录制（程序上次可能异常退出）。\n是否恢复为脚本？",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        tolerance = self.cfg.get("move_tolerance", 2.0) if self.cfg.get("compact_moves", True) else None
+        for path in paths:
+            try:
+                recover(path, tolerance=tolerance)
+            except Exception as e:
+                log(f"[录制日志] 恢复 {path} 失败：{e}")
+
     def start_play(self):
         # 获取最新脚本及其 id
         result = self.manager.load_latest()
@@ -1,9 +1,12 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QListWidget, QTextEdit, QPushButton, QFileDialog, QMessageBox
 from core.db import Database
+from core.report_manager import ReportManager
+from core.telemetry import PHASES, PHASE_NAMES
 from PyQt5.QtGui import QTextDocument
 from PyQt5.QtPrintSupport import QPrinter
 from PyQt5.QtWidgets import QFileDialog
 from utils.logger import log
+import os
 import time
 
 class ReportViewer(QWidget):
@@ -12,6 +15,7 @@ class ReportViewer(QWidget):
         self.setWindowTitle("测试报告查看")
         self.main_window = main_window
         self.db = Database.get_instance()
+        self.report_manager = ReportManager()
 
         self.report_list = QListWidget()
         self.detail_view = QTextEdit()
@@ -54,10 +58,42 @@ class ReportViewer(QWidget):
 执行摘要：{detail['summary']}
 成功率：{round(detail['success_rate'] * 100, 2)}%
 耗时：{detail['duration']} 秒
+回放模式：{detail['replay_mode'] or 'realtime'}
 创建时间：{detail['created_at']}
 """
+        timing = self.format_timing_stats(detail["id"])
+        if timing:
+            txt = txt.strip() + "\n\n" + timing
+        artifacts = self.report_manager.artifacts(detail["id"])
+        if artifacts:
+            lines = [f"步骤 {a['step_index'] + 1}：{a['path'] or '未保存（' + a['status'] + '）'}" for a in artifacts]
+            txt = txt.strip() + "\n\n失败截图：\n" + "\n".join(lines)
         self.detail_view.setPlainText(txt.strip())
 
+    def format_artifact_links(self, report_id):
+        """导出用：失败截图的文件链接列表"""
+        items = []
+        for a in self.report_manager.artifacts(report_id):
+            if a["path"]:
+                url = "file:///" + os.path.abspath(a["path"]).replace(os.sep, "/").lstrip("/")
+                items.append(f'<li>步骤 {a["step_index"] + 1}：<a href="{url}">{a["path"]}</a></li>')
+            else:
+                items.append(f'<li>步骤 {a["step_index"] + 1}：未保存（{a["status"]}）</li>')
+        return f"<h2>失败截图</h2><ul>{''.join(items)}</ul>" if items else ""
+
+    def format_timing_stats(self, report_id):
+        """按动作类型列出各阶段耗时的 p50 / p95（毫秒），旧报告没有分步计时时返回空字符串"""
+        stats = self.report_manager.timing_stats(report_id)
+        if not stats:
+            return ""
+        names = PHASES + ("total",)
+        lines = ["分步耗时（p50 / p95，毫秒）：",
+                 "动作 | 次数 | " + " | ".join(PHASE_NAMES[n] for n in names)]
+        for action, entry in stats.items():
+            cells = [f"{entry[n][0] * 1000:.0f} / {entry[n][1] * 1000:.0f}" for n in names]
+            lines.append(f"{action} | {entry['count']} | " + " | ".join(cells))
+        return "\n".join(lines)
+
 
     def export_report(self):
         """导出报告为PDF或HTML"""
@@ -82,8 +118,11 @@ class ReportViewer(QWidget):
         <p><b>脚本 ID:</b> {detail['script_id']}</p>
         <p><b>成功率:</b> {round(detail['success_rate'] * 100, 2)}%</p>
         <p><b>耗时:</b> {detail['duration']}s</p>
+        <p><b>回放模式:</b> {detail['replay_mode'] or 'realtime'}</p>
         <p><b>摘要:</b> {detail['summary']}</p>
-        <pre>{detail['detail'] if 'detail' in detail else ''}</pre>
+        <pre>{detail['detail'] if 'detail' in detail.keys() else ''}</pre>
+        <pre>{self.format_timing_stats(detail['id'])}</pre>
+        {self.format_artifact_links(detail['id'])}
         """
 
         # 根据文件扩展名决定保存为 HTML 或 PDF
@@ -9,6 +9,8 @@ from PyQt5.QtWidgets import QMenu, QAction
 import json
 import os
 from utils.logger import log
+from core.path_simplify import compact_moves
+from core.image_store import ImageStore
 
 class ScriptEditor(QWidget):
     def __init__(self, manager):
@@ -41,6 +43,7 @@ class ScriptEditor(QWidget):
         self.load_btn = QPushButton("导入脚本")
         self.save_btn = QPushButton("保存到数据库")
         self.export_btn = QPushButton("导出为JSON")
+        self.compact_btn = QPushButton("精简鼠标轨迹")
 
         layout = QVBoxLayout()
 
@@ -76,6 +79,7 @@ class ScriptEditor(QWidget):
         btn_row.addWidget(self.load_btn)
         btn_row.addWidget(self.save_btn)
         btn_row.addWidget(self.export_btn)
+        btn_row.addWidget(self.compact_btn)
         layout.addLayout(btn_row)
 
         self.setLayout(layout)
@@ -83,6 +87,7 @@ class ScriptEditor(QWidget):
         self.load_btn.clicked.connect(self.import_script)
         self.save_btn.clicked.connect(self.save_script)
         self.export_btn.clicked.connect(self.export_script)
+        self.compact_btn.clicked.connect(self.compact_script)
 
     def import_script(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择脚本文件", "", "JSON 文件 (*.json);;Python 文件 (*.py)")
@@ -126,6 +131,17 @@ class ScriptEditor(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "导出失败", f"{e}")
 
+    def compact_script(self):
+        """按像素容差精简编辑框中脚本的 move 轨迹（需保存后生效）"""
+        try:
+            script = json.loads(self.text_edit.toPlainText())
+            compacted, removed = compact_moves(script)
+            self.script = compacted
+            self.text_edit.setPlainText(json.dumps(compacted, indent=4, ensure_ascii=False))
+            QMessageBox.information(self, "精简完成", f"已移除 {removed} 个 move 步骤，剩余 {len(compacted)} 步")
+        except Exception as e:
+            QMessageBox.critical(self, "精简失败", f"{e}")
+
     def load_by_id(self, script_id):
         try:
             data = self.manager.load_by_id(script_id)
@@ -224,30 +240,22 @@ class ScriptEditor(QWidget):
             QMessageBox.warning(self, "无效图像格式", "请选择 PNG 或 JPG 格式的图像文件。")
             return
 
-        # 获取旧图像的完整路径
-        old_image_path = os.path.join("recorded_images", old_image_name)
-
-        # 替换文件系统中的图像
+        # 新图像导入图像库（按内容寻址，复制而不移动原文件）；旧图像可能被其他步骤或脚本共用，不在这里删除，
+        # 未被引用的图像可在图像管理页一键清理
         try:
-            # 删除旧图像
-            if os.path.exists(old_image_path):
-                os.remove(old_image_path)
-
-            # 复制新图像到图像目录
-            new_image_name = os.path.basename(new_image_path)
-            new_image_target_path = os.path.join("recorded_images", new_image_name)
-            os.rename(new_image_path, new_image_target_path)
+            digest, new_image_target_path = ImageStore.get_instance().put_file(new_image_path)
         except Exception as e:
             QMessageBox.critical(self, "图像替换失败", f"无法替换图像：{str(e)}")
             return
+        new_image_name = os.path.basename(new_image_target_path)
 
-        # 更新脚本中的图像引用路径
+        # 更新脚本中的图像引用
         for step in self.script:
             try:
                 locator = step["locator"]  # 直接访问而不使用 .get()
                 if locator["by"] == "image" and os.path.basename(locator["value"]) == old_image_name:
                     step["locator"]["value"] = new_image_target_path  # 替换路径
-                    break
+                    step["locator"]["hash"] = digest  # 同一图像可能被多个步骤共用，全部替换
             except KeyError as e:
                 log(f"[图像引用更新失败] 缺少键: {e}")
 
@@ -3,8 +3,6 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, QMessageBox, QLineEdit
 )
 from core.script_manager import ScriptManager
-from core.test_executor import TestExecutor
-from core.config_manager import ConfigManager
 import json
 import threading
 
@@ -14,7 +12,7 @@ class ScriptHistory(QWidget):
         self.main_window = main_window
         self.setWindowTitle("历史脚本管理")
         self.manager = ScriptManager()
-        self.executor = TestExecutor(ConfigManager().load_all())
+        self._executor = None
 
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -49,6 +47,18 @@ class ScriptHistory(QWidget):
 
         self.load_scripts()
 
+    @property
+    def executor(self):
+        """回放用的执行器：优先复用主窗口的，第一次回放时才创建"""
+        if self._executor is None:
+            if self.main_window:
+                self._executor = self.main_window.executor
+            else:
+                from core.test_executor import TestExecutor
+                from core.config_manager import ConfigManager
+                self._executor = TestExecutor(ConfigManager().load_all())
+        return self._executor
+
     def load_scripts(self):
         keyword = self.search_bar.text().strip().lower()
         self.script_list.clear()
@@ -77,10 +87,10 @@ class ScriptHistory(QWidget):
             QMessageBox.warning(self, "未选择脚本", "请选择一个脚本再进行回放。")
             return
         sid = self.scripts[index]["id"]
-        script = self.manager.load_by_id(sid)
+        script = self.manager.load_by_id(sid)["content"]
         def _run():
             try:
-                self.executor.run_script(script)
+                self.executor.run_script(script, sid)
                 QMessageBox.information(self, "回放完成", f"脚本 {sid} 执行完毕")
             except Exception as e:
                 QMessageBox.critical(self, "回放失败", str(e))
@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 from datetime import datetime, timedelta
 
@@ -7,7 +8,8 @@ class Logger:
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
         self.keep_days = keep_days
-        self._cleanup_old_logs()
+        # 清理旧日志放到后台线程，不拖慢启动
+        threading.Thread(target=self._cleanup_old_logs, daemon=True).start()
 
     def _now(self):
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,25 @@
+import time
+from utils.logger import log
+
+
+class StartupTimer:
+    """启动耗时分解：按阶段打点，窗口首次显示后统一输出"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.marks = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.marks.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        detail = "，".join(f"{name} {cost * 1000:.0f}ms" for name, cost in self.marks)
+        log(f"[启动耗时] 共 {total * 1000:.0f}ms：{detail}")
+
+
+# 全局启动计时器，在 main.py 最先导入
+startup_timer = StartupTimer()